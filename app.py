@@ -1,34 +1,171 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
+from flask.json.provider import JSONProvider
+import orjson
 import os
-import math
-import json
+from math import ceil, isfinite
+from functools import lru_cache
+from dataclasses import dataclass
 import logging
 from flask_cors import CORS
-from datetime import datetime
-from kp_profiles import get_profile, get_profiles_list, get_dimensions_correction_factor
+from datetime import datetime, timedelta
+import time
+from kp_profiles import PROFILES, get_profile, get_profiles_list, get_dimensions_correction_factor
 from io import BytesIO
-import traceback
+from types import MappingProxyType
+from werkzeug.exceptions import HTTPException, InternalServerError
+
+def _json_default(obj):
+    """Типы, которые orjson не сериализует сам: неизменяемые словари профилей (MappingProxyType)"""
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError
+
+def _json_bytes(obj):
+    """Сериализация в JSON через orjson (ключи сортируются, как в стандартном провайдере Flask)"""
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SORT_KEYS)
+
+class ORJSONProvider(JSONProvider):
+    """JSON-провайдер Flask на основе orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return _json_bytes(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_json_bytes(obj), mimetype="application/json")
 
 app = Flask(__name__, template_folder="templates")
-CORS(app, resources={r"/*": {"origins": "*"}})
-app.logger.setLevel(logging.DEBUG)
+app.json = ORJSONProvider(app)
+# Ограничение размера тела запроса (1 МБ с запасом покрывает пакет из _BATCH_MAX_SIZE конфигураций)
+app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
+# CORS нужен только JSON-API; страница и статика отдаются с того же домена
+CORS(app, resources={r"/(calculate|compare_estimate|generate_kp|get_)": {"origins": "*"}})
+# Подробное логирование запросов - только в режиме отладки
+app.logger.setLevel(logging.DEBUG if os.environ.get('FLASK_DEBUG') == '1' else logging.INFO)
 
 @app.before_request
 def log_request_info():
-    app.logger.debug('Headers: %s', request.headers)
-    app.logger.debug('Body: %s', request.get_data())
-
-@app.after_request
-def after_request(response):
-    # Добавляем заголовки CORS для всех запросов
-    response.headers.add("Access-Control-Allow-Origin", "*")
-    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
-    response.headers.add("Access-Control-Allow-Methods", "GET,PUT,POST,DELETE,OPTIONS")
-    app.logger.debug('Response status: %s', response.status)
-    app.logger.debug('Response Content-Type: %s', response.content_type)
-    return response
-
-def calculate_basic_dimensions(length, width, depth, wall_thickness, correction_factors=None):
+    # Тело запроса читается только если DEBUG-сообщения действительно будут записаны
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug('Headers: %s', request.headers)
+        app.logger.debug('Body: %s', request.get_data())
+
+# Маршруты JSON-API без собственной обработки исключений - их ошибки отдаются в JSON
+_JSON_ERROR_ENDPOINTS = frozenset((
+    "generate_kp",
+    "get_profiles",
+    "get_profile_route",
+    "get_dimensions_correction",
+    "get_prices",
+    "get_costs",
+))
+
+@app.errorhandler(ValueError)
+@app.errorhandler(TypeError)
+def handle_bad_input(e):
+    """Некорректные входные данные (ошибки преобразования типов) - ответ 400 без текста исключения"""
+    if request.endpoint not in _JSON_ERROR_ENDPOINTS:
+        return handle_unexpected_error(e)
+    app.logger.warning("Invalid input in %s: %s", request.path, e)
+    return _error_response(_ERROR_BAD_INPUT)
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    """Непредвиденные ошибки: запись в лог и ответ 500 без подробностей исключения"""
+    # HTTP-ошибки (404, 405, 413 и т.п.) отдаются стандартным ответом Flask
+    if isinstance(e, HTTPException):
+        return e
+    app.logger.exception("Unexpected error in %s", request.path)
+    if request.endpoint not in _JSON_ERROR_ENDPOINTS:
+        return InternalServerError(original_exception=e)
+    return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+
+@dataclass(slots=True, frozen=True)
+class PoolGeometry:
+    """Размеры бассейна в метрах и производные величины, общие для всех расчетов"""
+    length: float  # Внутренняя длина
+    width: float  # Внутренняя ширина
+    depth: float  # Внутренняя глубина
+    wall_thickness: float  # Толщина стен и дна
+    outer_length: float  # Наружная длина (внутренняя + стены с обеих сторон)
+    outer_width: float  # Наружная ширина
+    outer_area: float  # Площадь дна по наружным размерам
+    inner_perimeter: float
+    outer_perimeter: float
+    water_surface: float  # Площадь дна по внутренним размерам
+    bottom_concrete_volume: float  # Бетон дна (по наружным размерам)
+    walls_concrete_volume: float  # Бетон стен (по внутреннему периметру)
+    
+    @classmethod
+    def from_mm(cls, length, width, depth, wall_thickness):
+        """Построить геометрию по размерам в мм"""
+        length_m = length / 1000
+        width_m = width / 1000
+        depth_m = depth / 1000
+        wall_thickness_m = wall_thickness / 1000
+        outer_length = length_m + 2 * wall_thickness_m
+        outer_width = width_m + 2 * wall_thickness_m
+        outer_area = outer_length * outer_width
+        inner_perimeter = 2 * (length_m + width_m)
+        return cls(
+            length_m, width_m, depth_m, wall_thickness_m,
+            outer_length, outer_width, outer_area,
+            inner_perimeter, 2 * (outer_length + outer_width),
+            length_m * width_m,
+            outer_area * wall_thickness_m,
+            inner_perimeter * depth_m * wall_thickness_m
+        )
+
+@dataclass(slots=True)
+class BasicDims:
+    """Числовые основные размеры бассейна (с учетом коэффициентов корректировки профиля)"""
+    water_surface: float
+    perimeter: float
+    wall_area: float
+    finishing_area: float
+    water_volume: float
+    concrete_volume: float
+    earth_volume: float
+    outer_length: float
+    outer_width: float
+    outer_perimeter: float
+    pit_area: float
+    pit_length: float
+    pit_width: float
+    pit_depth: float
+
+def _format_values(spec, values):
+    """
+    Форматирует числовые результаты для отображения
+    
+    Args:
+        spec (tuple): Пары (подпись, %-шаблон с единицей измерения)
+        values (tuple): Значения в том же порядке, что и spec
+        
+    Returns:
+        dict: Словарь {подпись: отформатированная строка}
+    """
+    return {label: template % value for (label, template), value in zip(spec, values)}
+
+# Подписи и шаблоны отображения основных размеров
+_BASIC_DIMENSIONS_FORMAT = (
+    ("Глубина", "%.0f мм"),
+    ("Длина внутренняя", "%.0f мм"),
+    ("Ширина внутренняя", "%.0f мм"),
+    ("Площадь водного зеркала", "%.1f м²"),
+    ("Периметр", "%.1f м/п"),
+    ("Площадь стен", "%.1f м²"),
+    ("Площадь отделки", "%.1f м²"),
+    ("Объем воды", "%.1f м³"),
+    ("Объем бетона", "%.1f м³"),
+    ("Объем земляных работ", "%.1f м³"),
+    ("Общая площадь", "%.1f м²")
+)
+
+def calculate_basic_dimensions(length, width, depth, wall_thickness, correction_factors=None, geometry=None):
     """
     Расчет основных размеров бассейна с учетом профиля КП
     
@@ -38,29 +175,26 @@ def calculate_basic_dimensions(length, width, depth, wall_thickness, correction_
         depth (float): Глубина бассейна в мм (внутренний размер)
         wall_thickness (float): Толщина стен и дна в мм
         correction_factors (dict): Коэффициенты корректировки размеров
+        geometry (PoolGeometry, optional): Уже рассчитанная геометрия для этих размеров
         
     Returns:
         dict: Словарь с основными размерами
     """
-    
-    # Конвертируем размеры в метры
-    length_m = length / 1000  # Внутренняя длина в метрах
-    width_m = width / 1000    # Внутренняя ширина в метрах
-    depth_m = depth / 1000    # Внутренняя глубина в метрах
-    wall_thickness_m = wall_thickness / 1000  # Толщина стен в метрах
-    
-    # Наружные размеры бассейна (внутренние + толщина стен с каждой стороны)
-    outer_length_m = length_m + (2 * wall_thickness_m)
-    outer_width_m = width_m + (2 * wall_thickness_m)
-    
-    # Периметр по внутренним размерам
-    inner_perimeter = 2 * (length_m + width_m)
-    
-    # Периметр по наружным размерам
-    outer_perimeter = 2 * (outer_length_m + outer_width_m)
-    
-    # Расчет площади водного зеркала (площадь дна по внутренним размерам)
-    water_surface = length_m * width_m
+    if geometry is None:
+        geometry = PoolGeometry.from_mm(length, width, depth, wall_thickness)
+    
+    # Размеры в метрах, наружные размеры и периметры
+    length_m = geometry.length
+    width_m = geometry.width
+    depth_m = geometry.depth
+    wall_thickness_m = geometry.wall_thickness
+    outer_length_m = geometry.outer_length
+    outer_width_m = geometry.outer_width
+    inner_perimeter = geometry.inner_perimeter
+    outer_perimeter = geometry.outer_perimeter
+    
+    # Площадь водного зеркала (площадь дна по внутренним размерам)
+    water_surface = geometry.water_surface
     
     # Расчет площади стен (периметр по внутренним размерам умноженный на глубину)
     wall_area = inner_perimeter * depth_m
@@ -71,17 +205,8 @@ def calculate_basic_dimensions(length, width, depth, wall_thickness, correction_
     # Расчет объема воды
     water_volume = water_surface * depth_m
     
-    # Наружные размеры дна
-    outer_bottom_area = outer_length_m * outer_width_m
-    
-    # Объем бетона дна
-    bottom_concrete_volume = outer_bottom_area * wall_thickness_m
-    
-    # Объем бетона стен (периметр внутренний * высоту * толщину)
-    walls_concrete_volume = inner_perimeter * depth_m * wall_thickness_m
-    
-    # Общий объем бетона
-    concrete_volume = bottom_concrete_volume + walls_concrete_volume
+    # Общий объем бетона (дно + стены, те же объемы, что и в бетонных работах)
+    concrete_volume = geometry.bottom_concrete_volume + geometry.walls_concrete_volume
     
     # Расчет объема земляных работ
     # Размеры котлована с запасом 800 мм с каждой стороны от внутреннего размера
@@ -113,58 +238,34 @@ def calculate_basic_dimensions(length, width, depth, wall_thickness, correction_
     finishing_area = finishing_area * correction_factors.get("finishing_area", 1.0)
     water_volume = water_volume * correction_factors.get("water_volume", 1.0)
     
-    # Создаем словарь с "сырыми" числовыми значениями для использования в других функциях
-    raw_dims = {
-        "water_surface": water_surface,
-        "perimeter": inner_perimeter,
-        "wall_area": wall_area,
-        "finishing_area": finishing_area,
-        "water_volume": water_volume,
-        "concrete_volume": concrete_volume,
-        "earth_volume": earth_volume,
-        "outer_length": outer_length_m,
-        "outer_width": outer_width_m,
-        "outer_perimeter": outer_perimeter,
-        "pit_area": pit_area,
-        "pit_length": pit_length,
-        "pit_width": pit_width,
-        "pit_depth": pit_depth
-    }
+    # "Сырые" числовые значения для использования в других функциях
+    raw_dims = BasicDims(
+        water_surface, inner_perimeter, wall_area, finishing_area, water_volume,
+        concrete_volume, earth_volume, outer_length_m, outer_width_m, outer_perimeter,
+        pit_area, pit_length, pit_width, pit_depth
+    )
     
     # Возвращаем словарь с форматированными и сырыми значениями
-    return {
-        "Глубина": f"{depth_m * 1000:.0f} мм",
-        "Длина внутренняя": f"{length_m * 1000:.0f} мм",
-        "Ширина внутренняя": f"{width_m * 1000:.0f} мм",
-        "Площадь водного зеркала": f"{water_surface:.1f} м²",
-        "Периметр": f"{inner_perimeter:.1f} м/п",
-        "Площадь стен": f"{wall_area:.1f} м²",
-        "Площадь отделки": f"{finishing_area:.1f} м²",
-        "Объем воды": f"{water_volume:.1f} м³",
-        "Объем бетона": f"{concrete_volume:.1f} м³",
-        "Объем земляных работ": f"{earth_volume:.1f} м³",
-        "Общая площадь": f"{finishing_area:.1f} м²",
-        "_raw": raw_dims  # Включаем сырые данные для использования в других функциях
-    }
+    result = _format_values(_BASIC_DIMENSIONS_FORMAT, (
+        depth_m * 1000, length_m * 1000, width_m * 1000,
+        water_surface, inner_perimeter, wall_area, finishing_area,
+        water_volume, concrete_volume, earth_volume, finishing_area
+    ))
+    result["_raw"] = raw_dims  # Включаем сырые данные для использования в других функциях
+    return result
 
-def calculate_earthworks(length, width, depth, wall_thickness):
+def _earthworks_kernel(geometry):
     """
-    Расчет земляных работ
+    Числовая часть расчета земляных работ (только float/int, без словарей и строк)
     
-    Args:
-        length (float): Длина бассейна в мм (внутренний размер)
-        width (float): Ширина бассейна в мм (внутренний размер)
-        depth (float): Глубина бассейна в мм (внутренний размер)
-        wall_thickness (float): Толщина стен и дна в мм
-        
     Returns:
-        dict: Словарь с результатами расчета
+        tuple: (pit_depth, pit_length, pit_width, pit_area, pit_volume,
+                backfill_volume, removal_volume, trucks_count)
     """
-    # Конвертируем размеры в метры
-    length_m = length / 1000
-    width_m = width / 1000
-    depth_m = depth / 1000
-    wall_thickness_m = wall_thickness / 1000
+    length_m = geometry.length
+    width_m = geometry.width
+    depth_m = geometry.depth
+    wall_thickness_m = geometry.wall_thickness
     
     # Размеры котлована (внутренние размеры + толщина стен + 800мм с каждой стороны)
     pit_length = length_m + 2 * (wall_thickness_m + 0.8)  # +800 мм с каждой стороны для работы
@@ -178,10 +279,8 @@ def calculate_earthworks(length, width, depth, wall_thickness):
     pit_volume = pit_area * pit_depth
     
     # Объем обратной засыпки (объем котлована минус объем бассейна с учетом стен)
-    outer_length = length_m + 2 * wall_thickness_m
-    outer_width = width_m + 2 * wall_thickness_m
     outer_depth = depth_m + wall_thickness_m
-    pool_volume = outer_length * outer_width * outer_depth
+    pool_volume = geometry.outer_area * outer_depth
     
     # Объем пространства между бассейном и краем котлована
     backfill_volume = pit_volume - pool_volume
@@ -190,53 +289,62 @@ def calculate_earthworks(length, width, depth, wall_thickness):
     removal_volume = pit_volume
     
     # Количество КАМАЗов (1 КАМАЗ ~ 7 м³)
-    trucks_count = math.ceil(removal_volume / 7)
+    trucks_count = ceil(removal_volume / 7)
     
-    return {
-        "Глубина котлована": f"{pit_depth * 1000:.0f} мм",
-        "Длина котлована": f"{pit_length * 1000:.0f} мм",
-        "Ширина котлована": f"{pit_width * 1000:.0f} мм",
-        "Площадь котлована": f"{pit_area:.1f} м²",
-        "Объем земляных работ": f"{pit_volume:.1f} м³",
-        "Объем обратной засыпки": f"{backfill_volume:.1f} м³",
-        "Объем вывоза грунта": f"{removal_volume:.1f} м³",
-        "Количество КАМАЗов": f"{trucks_count}"
-    }
+    return (pit_depth, pit_length, pit_width, pit_area, pit_volume,
+            backfill_volume, removal_volume, trucks_count)
+
+# Подписи и шаблоны отображения земляных работ
+_EARTHWORKS_FORMAT = (
+    ("Глубина котлована", "%.0f мм"),
+    ("Длина котлована", "%.0f мм"),
+    ("Ширина котлована", "%.0f мм"),
+    ("Площадь котлована", "%.1f м²"),
+    ("Объем земляных работ", "%.1f м³"),
+    ("Объем обратной засыпки", "%.1f м³"),
+    ("Объем вывоза грунта", "%.1f м³"),
+    ("Количество КАМАЗов", "%d")
+)
 
-def calculate_concrete_works(length, width, depth, wall_thickness):
+def calculate_earthworks(length, width, depth, wall_thickness, geometry=None):
     """
-    Расчет бетонных работ
+    Расчет земляных работ
     
     Args:
         length (float): Длина бассейна в мм (внутренний размер)
         width (float): Ширина бассейна в мм (внутренний размер)
         depth (float): Глубина бассейна в мм (внутренний размер)
         wall_thickness (float): Толщина стен и дна в мм
+        geometry (PoolGeometry, optional): Уже рассчитанная геометрия для этих размеров
         
     Returns:
         dict: Словарь с результатами расчета
     """
-    # Конвертируем размеры в метры
-    length_m = length / 1000
-    width_m = width / 1000
-    depth_m = depth / 1000
-    wall_thickness_m = wall_thickness / 1000
-    
-    # Наружные размеры бассейна
-    outer_length = length_m + 2 * wall_thickness_m
-    outer_width = width_m + 2 * wall_thickness_m
+    if geometry is None:
+        geometry = PoolGeometry.from_mm(length, width, depth, wall_thickness)
     
-    # Площадь основания (по наружным размерам)
-    base_area = outer_length * outer_width
+    (pit_depth, pit_length, pit_width, pit_area, pit_volume,
+     backfill_volume, removal_volume, trucks_count) = _earthworks_kernel(geometry)
     
-    # Объем бетона для основания
-    base_concrete_volume = base_area * wall_thickness_m
+    return _format_values(_EARTHWORKS_FORMAT, (
+        pit_depth * 1000, pit_length * 1000, pit_width * 1000, pit_area,
+        pit_volume, backfill_volume, removal_volume, trucks_count
+    ))
+
+def _concrete_works_kernel(geometry):
+    """
+    Числовая часть расчета бетонных работ (только float, без словарей и строк)
     
-    # Периметр внутренний
-    inner_perimeter = 2 * (length_m + width_m)
+    Returns:
+        tuple: (gravel_volume, base_concrete_volume, walls_concrete_volume,
+                total_concrete_volume, reinforcement_weight)
+    """
+    # Площадь основания (по наружным размерам)
+    base_area = geometry.outer_area
     
-    # Объем бетона для стен
-    walls_concrete_volume = inner_perimeter * depth_m * wall_thickness_m
+    # Объемы бетона основания и стен рассчитаны вместе с геометрией
+    base_concrete_volume = geometry.bottom_concrete_volume
+    walls_concrete_volume = geometry.walls_concrete_volume
     
     # Общий объем бетона
     total_concrete_volume = base_concrete_volume + walls_concrete_volume
@@ -248,48 +356,59 @@ def calculate_concrete_works(length, width, depth, wall_thickness):
     # Вес арматуры (примерно 100 кг на 1 м³ бетона)
     reinforcement_weight = total_concrete_volume * 100  # кг
     
-    return {
-        "Объем щебня": f"{gravel_volume:.1f} м³",
-        "Объем бетона основания": f"{base_concrete_volume:.1f} м³",
-        "Объем бетона стен": f"{walls_concrete_volume:.1f} м³",
-        "Общий объем бетона": f"{total_concrete_volume:.1f} м³",
-        "Вес арматуры": f"{reinforcement_weight:.0f} кг"
-    }
+    return (gravel_volume, base_concrete_volume, walls_concrete_volume,
+            total_concrete_volume, reinforcement_weight)
+
+# Подписи и шаблоны отображения бетонных работ
+_CONCRETE_WORKS_FORMAT = (
+    ("Объем щебня", "%.1f м³"),
+    ("Объем бетона основания", "%.1f м³"),
+    ("Объем бетона стен", "%.1f м³"),
+    ("Общий объем бетона", "%.1f м³"),
+    ("Вес арматуры", "%.0f кг")
+)
 
-def calculate_formwork(length, width, depth, wall_thickness):
+def calculate_concrete_works(length, width, depth, wall_thickness, geometry=None):
     """
-    Расчет опалубки и армирования
+    Расчет бетонных работ
     
     Args:
         length (float): Длина бассейна в мм (внутренний размер)
         width (float): Ширина бассейна в мм (внутренний размер)
         depth (float): Глубина бассейна в мм (внутренний размер)
         wall_thickness (float): Толщина стен и дна в мм
+        geometry (PoolGeometry, optional): Уже рассчитанная геометрия для этих размеров
         
     Returns:
         dict: Словарь с результатами расчета
     """
-    # Конвертируем размеры в метры
-    length_m = length / 1000
-    width_m = width / 1000
-    depth_m = depth / 1000
-    wall_thickness_m = wall_thickness / 1000
+    if geometry is None:
+        geometry = PoolGeometry.from_mm(length, width, depth, wall_thickness)
     
-    # Наружные размеры бассейна
-    outer_length = length_m + 2 * wall_thickness_m
-    outer_width = width_m + 2 * wall_thickness_m
+    (gravel_volume, base_concrete_volume, walls_concrete_volume,
+     total_concrete_volume, reinforcement_weight) = _concrete_works_kernel(geometry)
     
-    # Наружный периметр
-    outer_perimeter = 2 * (outer_length + outer_width)
+    return _format_values(_CONCRETE_WORKS_FORMAT, (
+        gravel_volume, base_concrete_volume, walls_concrete_volume,
+        total_concrete_volume, reinforcement_weight
+    ))
+
+def _formwork_kernel(geometry):
+    """
+    Числовая часть расчета опалубки и армирования (только float/int, без словарей и строк)
+    
+    Returns:
+        tuple: (outer_formwork_area, inner_formwork_area, total_formwork_area,
+                plywood_sheets_count, rebar_weight, timber_length)
+    """
+    depth_m = geometry.depth
+    inner_perimeter = geometry.inner_perimeter
     
     # Высота наружной опалубки (глубина + толщина дна)
-    outer_formwork_height = depth_m + wall_thickness_m
+    outer_formwork_height = depth_m + geometry.wall_thickness
     
     # Площадь наружной опалубки
-    outer_formwork_area = outer_perimeter * outer_formwork_height
-    
-    # Внутренний периметр
-    inner_perimeter = 2 * (length_m + width_m)
+    outer_formwork_area = geometry.outer_perimeter * outer_formwork_height
     
     # Высота внутренней опалубки (равна глубине)
     inner_formwork_height = depth_m
@@ -302,10 +421,10 @@ def calculate_formwork(length, width, depth, wall_thickness):
     
     # Количество листов фанеры (лист 1.5x1.5 м = 2.25 м²), с запасом 20% на распил
     plywood_sheet_area = 2.25  # м²
-    plywood_sheets_count = math.ceil(total_formwork_area / plywood_sheet_area * 1.2)
+    plywood_sheets_count = ceil(total_formwork_area / plywood_sheet_area * 1.2)
     
     # Площадь армирования (внутренняя площадь стен + площадь дна)
-    reinforcement_area = inner_perimeter * depth_m + length_m * width_m
+    reinforcement_area = inner_perimeter * depth_m + geometry.water_surface
     
     # Вес арматуры (примерно 5 кг/м² для двойного армирования)
     rebar_weight = reinforcement_area * 5  # кг
@@ -313,22 +432,105 @@ def calculate_formwork(length, width, depth, wall_thickness):
     # Длина бруса 50x100 (для опалубки, примерно 3 м/п на 1 м² опалубки)
     timber_length = total_formwork_area * 3  # метры
     
-    return {
-        "Площадь наружной опалубки": f"{outer_formwork_area:.1f} м²",
-        "Площадь внутренней опалубки": f"{inner_formwork_area:.1f} м²",
-        "Общая площадь опалубки": f"{total_formwork_area:.1f} м²",
-        "Количество листов фанеры": f"{plywood_sheets_count}",
-        "Вес арматуры": f"{rebar_weight:.0f} кг",
-        "Длина бруса 50x100": f"{timber_length:.0f} м"
+    return (outer_formwork_area, inner_formwork_area, total_formwork_area,
+            plywood_sheets_count, rebar_weight, timber_length)
+
+# Подписи и шаблоны отображения опалубки и армирования
+_FORMWORK_FORMAT = (
+    ("Площадь наружной опалубки", "%.1f м²"),
+    ("Площадь внутренней опалубки", "%.1f м²"),
+    ("Общая площадь опалубки", "%.1f м²"),
+    ("Количество листов фанеры", "%d"),
+    ("Вес арматуры", "%.0f кг"),
+    ("Длина бруса 50x100", "%.0f м")
+)
+
+def calculate_formwork(length, width, depth, wall_thickness, geometry=None):
+    """
+    Расчет опалубки и армирования
+    
+    Args:
+        length (float): Длина бассейна в мм (внутренний размер)
+        width (float): Ширина бассейна в мм (внутренний размер)
+        depth (float): Глубина бассейна в мм (внутренний размер)
+        wall_thickness (float): Толщина стен и дна в мм
+        geometry (PoolGeometry, optional): Уже рассчитанная геометрия для этих размеров
+        
+    Returns:
+        dict: Словарь с результатами расчета
+    """
+    if geometry is None:
+        geometry = PoolGeometry.from_mm(length, width, depth, wall_thickness)
+    
+    (outer_formwork_area, inner_formwork_area, total_formwork_area,
+     plywood_sheets_count, rebar_weight, timber_length) = _formwork_kernel(geometry)
+    
+    return _format_values(_FORMWORK_FORMAT, (
+        outer_formwork_area, inner_formwork_area, total_formwork_area,
+        plywood_sheets_count, rebar_weight, timber_length
+    ))
+
+def calculate_batch(lengths, widths, depths, wall_thicknesses):
+    """
+    Пакетный расчет объемов для нескольких конфигураций бассейна
+    
+    Args:
+        lengths (list): Длины бассейнов в мм
+        widths (list): Ширины бассейнов в мм
+        depths (list): Глубины бассейнов в мм
+        wall_thicknesses (list): Толщины стен и дна в мм
+        
+    Returns:
+        dict: Словарь списков (по одному значению на конфигурацию)
+    """
+    batch = {
+        "water_surface": [],
+        "perimeter": [],
+        "water_volume": [],
+        "pit_volume": [],
+        "backfill_volume": [],
+        "trucks_count": [],
+        "gravel_volume": [],
+        "concrete_volume": [],
+        "formwork_area": [],
+        "plywood_sheets": [],
+        "rebar_weight": []
     }
+    
+    for length, width, depth, wall_thickness in zip(lengths, widths, depths, wall_thicknesses):
+        geometry = PoolGeometry.from_mm(length, width, depth, wall_thickness)
+        water_surface = geometry.water_surface
+        
+        (_, _, _, _, pit_volume, backfill_volume, _, trucks_count) = _earthworks_kernel(geometry)
+        (gravel_volume, _, _, concrete_volume, _) = _concrete_works_kernel(geometry)
+        (_, _, formwork_area, plywood_sheets, rebar_weight, _) = _formwork_kernel(geometry)
+        
+        batch["water_surface"].append(water_surface)
+        batch["perimeter"].append(geometry.inner_perimeter)
+        batch["water_volume"].append(water_surface * depth / 1000)
+        batch["pit_volume"].append(pit_volume)
+        batch["backfill_volume"].append(backfill_volume)
+        batch["trucks_count"].append(trucks_count)
+        batch["gravel_volume"].append(gravel_volume)
+        batch["concrete_volume"].append(concrete_volume)
+        batch["formwork_area"].append(formwork_area)
+        batch["plywood_sheets"].append(plywood_sheets)
+        batch["rebar_weight"].append(rebar_weight)
+    
+    return batch
+
+def _format_rub(amount):
+    """Сумма для отображения в виде "1 234 567 руб." (с округлением до рубля)"""
+    return f"{round(amount):,} руб.".replace(",", " ")
 
-def calculate_finishing_cost(basic_dims, profile_id="kp1"):
+def calculate_finishing_cost(basic_dims, profile_id="kp1", profile=None):
     """
     Расчет стоимости отделочных работ с учетом профиля КП
     
     Args:
-        basic_dims (dict): Словарь с основными размерами или сырыми значениями
+        basic_dims (dict or BasicDims): Результат calculate_basic_dimensions или его "_raw"
         profile_id (str): Идентификатор профиля КП
+        profile (dict, optional): Уже полученный профиль КП (иначе берется по profile_id)
         
     Returns:
         dict: Словарь с расчетами стоимости отделочных работ
@@ -342,91 +544,18 @@ def calculate_finishing_cost(basic_dims, profile_id="kp1"):
     if not isinstance(profile_id, str):
         profile_id = "kp1"
         
-    try:
-        profile = get_profile(profile_id)
-    except Exception as e:
-        app.logger.error("Error getting profile in calculate_finishing_cost: %s", str(e))
-        profile = get_profile("kp1")  # Используем KP1 по умолчанию
-    
-    # Определяем, переданы ли сырые значения или словарь с форматированными значениями
-    finishing_area = 0
-    perimeter = 0
-    
-    try:
-        # Если есть _raw, используем его для извлечения числовых значений
-        if isinstance(basic_dims, dict) and "_raw" in basic_dims:
-            raw_data = basic_dims["_raw"]
-            if isinstance(raw_data, dict):
-                finishing_area = raw_data.get("Площадь под отделку", 0)
-                # Если не нашли "Площадь под отделку", используем альтернативные ключи
-                if finishing_area == 0:
-                    finishing_area = raw_data.get("finishing_area", 0)
-                
-                perimeter = raw_data.get("Периметр", 0)
-                # Если не нашли "Периметр", используем альтернативные ключи
-                if perimeter == 0:
-                    perimeter = raw_data.get("perimeter", 0)
-        
-        # Если не удалось извлечь из _raw, пробуем извлечь из основных полей
-        if finishing_area == 0 and isinstance(basic_dims, dict):
-            if "Площадь под отделку" in basic_dims:
-                value = basic_dims["Площадь под отделку"]
-                if isinstance(value, (int, float)):
-                    finishing_area = value
-                elif isinstance(value, str):
-                    try:
-                        # Извлекаем число из строки вида "71.6 м²"
-                        parts = value.split()
-                        if parts:
-                            finishing_area = float(parts[0].replace(',', '.'))
-                    except (ValueError, IndexError) as e:
-                        app.logger.warning("Error extracting finishing_area from '%s': %s", value, str(e))
-            
-            # Альтернативное название
-            elif "finishing_area" in basic_dims:
-                value = basic_dims["finishing_area"]
-                if isinstance(value, (int, float)):
-                    finishing_area = value
-                elif isinstance(value, str):
-                    try:
-                        parts = value.split()
-                        if parts:
-                            finishing_area = float(parts[0].replace(',', '.'))
-                    except (ValueError, IndexError) as e:
-                        app.logger.warning("Error extracting finishing_area from '%s': %s", value, str(e))
-            
-            # Так же с периметром
-            if "Периметр" in basic_dims:
-                value = basic_dims["Периметр"]
-                if isinstance(value, (int, float)):
-                    perimeter = value
-                elif isinstance(value, str):
-                    try:
-                        parts = value.split()
-                        if parts:
-                            perimeter = float(parts[0].replace(',', '.'))
-                    except (ValueError, IndexError) as e:
-                        app.logger.warning("Error extracting perimeter from '%s': %s", value, str(e))
-            
-            # Альтернативное название
-            elif "perimeter" in basic_dims:
-                value = basic_dims["perimeter"]
-                if isinstance(value, (int, float)):
-                    perimeter = value
-                elif isinstance(value, str):
-                    try:
-                        parts = value.split()
-                        if parts:
-                            perimeter = float(parts[0].replace(',', '.'))
-                    except (ValueError, IndexError) as e:
-                        app.logger.warning("Error extracting perimeter from '%s': %s", value, str(e))
+    if profile is None:
+        try:
+            profile = get_profile(profile_id)
+        except Exception as e:
+            app.logger.error("Error getting profile in calculate_finishing_cost: %s", str(e))
+            profile = get_profile("kp1")  # Используем KP1 по умолчанию
     
-    except Exception as e:
-        app.logger.error("Error extracting dimensions in calculate_finishing_cost: %s", str(e))
-        # В случае ошибки используем значения по умолчанию
-        # Значения из KP1
-        finishing_area = profile["basic_dimensions"].get("finishing_area", 71.6)
-        perimeter = profile["basic_dimensions"].get("perimeter", 24.0)
+    # Числовые значения берутся из "_raw" (BasicDims из calculate_basic_dimensions);
+    # BasicDims можно передать и напрямую
+    raw_dims = basic_dims["_raw"] if isinstance(basic_dims, dict) else basic_dims
+    finishing_area = raw_dims.finishing_area
+    perimeter = raw_dims.perimeter
     
     # Для КП1 используем фиксированные значения из КП
     if profile_id == "kp1":
@@ -457,19 +586,19 @@ def calculate_finishing_cost(basic_dims, profile_id="kp1"):
             "perimeter": perimeter,
             "lining": {
                 "cost": lining_cost,
-                "cost_str": f"{lining_cost:,.0f} руб.".replace(",", " ")
+                "cost_str": _format_rub(lining_cost)
             },
             "coping_stone": {
                 "cost": coping_stone_cost,
                 "total": coping_stone_cost,
-                "cost_str": f"{coping_stone_cost:,.0f} руб.".replace(",", " ")
+                "cost_str": _format_rub(coping_stone_cost)
             },
             "material_cost": lining_cost,
-            "material_cost_str": f"{lining_cost:,.0f} руб.".replace(",", " "),
+            "material_cost_str": _format_rub(lining_cost),
             "work_cost": work_cost,
-            "work_cost_str": f"{work_cost:,.0f} руб.".replace(",", " "),
+            "work_cost_str": _format_rub(work_cost),
             "total_cost": total_cost,
-            "total_cost_str": f"{total_cost:,.0f} руб.".replace(",", " ")
+            "total_cost_str": _format_rub(total_cost)
         }
     
     # Для других профилей можно реализовать аналогичный расчет
@@ -516,21 +645,21 @@ def calculate_finishing_cost(basic_dims, profile_id="kp1"):
             "area": finishing_area,
             "perimeter": perimeter,
             "materials": {
-                "Плитка": f"{tile_cost:,.0f} руб.".replace(",", " "),
-                "Затирка": f"{grout_cost:,.0f} руб.".replace(",", " "),
-                "Клей для плитки": f"{adhesive_cost:,.0f} руб.".replace(",", " "),
-                "Гидроизоляция": f"{waterproofing_cost:,.0f} руб.".replace(",", " ")
+                "Плитка": _format_rub(tile_cost),
+                "Затирка": _format_rub(grout_cost),
+                "Клей для плитки": _format_rub(adhesive_cost),
+                "Гидроизоляция": _format_rub(waterproofing_cost)
             },
             "works": {
-                "Укладка плитки": f"{laying_cost:,.0f} руб.".replace(",", " "),
-                "Затирка швов": f"{grouting_cost:,.0f} руб.".replace(",", " ")
+                "Укладка плитки": _format_rub(laying_cost),
+                "Затирка швов": _format_rub(grouting_cost)
             },
             "material_cost": materials_cost,
-            "material_cost_str": f"{materials_cost:,.0f} руб.".replace(",", " "),
+            "material_cost_str": _format_rub(materials_cost),
             "work_cost": work_cost,
-            "work_cost_str": f"{work_cost:,.0f} руб.".replace(",", " "),
+            "work_cost_str": _format_rub(work_cost),
             "total_cost": total_cost,
-            "total_cost_str": f"{total_cost:,.0f} руб.".replace(",", " ")
+            "total_cost_str": _format_rub(total_cost)
         }
     
     # По умолчанию используем простой расчет для KP3 или других профилей
@@ -551,126 +680,135 @@ def calculate_finishing_cost(basic_dims, profile_id="kp1"):
             "area": finishing_area,
             "perimeter": perimeter,
             "material_cost": materials_cost,
-            "material_cost_str": f"{materials_cost:,.0f} руб.".replace(",", " "),
+            "material_cost_str": _format_rub(materials_cost),
             "work_cost": work_cost,
-            "work_cost_str": f"{work_cost:,.0f} руб.".replace(",", " "),
+            "work_cost_str": _format_rub(work_cost),
             "total_cost": total_cost,
-            "total_cost_str": f"{total_cost:,.0f} руб.".replace(",", " ")
+            "total_cost_str": _format_rub(total_cost)
         }
 
-def calculate_materials_cost(basic_dims, profile_id):
+# Разбивка общей стоимости на категории для отображения в интерфейсе
+# (значения примерные и взяты из КП)
+_MATERIALS_COST_BREAKDOWN = {
+    "kp1": (
+        ("Земляные работы", 48800),
+        ("Транспорт", 97500),
+        ("Песок и щебень", 17300),
+        ("Материалы опалубки", 144500),
+        ("Арматура и сопутствующие", 177000),
+        ("Бетон с доставкой", 169750),
+        ("Вспомогательные материалы", 162026)
+    ),
+    "kp2": (
+        ("Строительные материалы", 275000),
+        ("Отделочные материалы", 180000),
+        ("Вспомогательные материалы", 128398)
+    ),
+    "kp3": (
+        ("Строительные материалы", 180000),
+        ("Отделочные материалы", 90000),
+        ("Вспомогательные материалы", 50631)
+    )
+}
+
+_WORKS_COST_BREAKDOWN = {
+    "kp1": (
+        ("Подготовительные работы", 73000),
+        ("Земляные работы", 29000),
+        ("Бетонирование", 177600),
+        ("Опалубка и армирование", 204260),
+        ("Монтаж закладных", 40500),
+        ("Обратная засыпка", 50400),
+        ("Отделочные работы", 252100),
+        ("Монтаж бортового камня", 65000),
+        ("Разгрузка материалов", 30000)
+    ),
+    "kp2": (
+        ("Подготовительные и земляные работы", 120000),
+        ("Бетонные работы", 180000),
+        ("Опалубка и армирование", 105000),
+        ("Отделочные работы", 170690),
+        ("Монтаж бортового камня", 40000)
+    ),
+    "kp3": (
+        ("Подготовительные и земляные работы", 90000),
+        ("Бетонные работы", 104284),
+        ("Опалубка и армирование", 90000),
+        ("Отделочные работы", 110000)
+    )
+}
+
+def _format_cost_breakdown(breakdown):
+    """
+    Форматирует разбивку стоимости по профилям в строки вида "48 800 руб."
+    
+    Вызывается один раз при импорте; полученные словари общие для всех запросов
+    и не должны изменяться.
+    """
+    return {
+        profile_id: {label: _format_rub(amount) for label, amount in items}
+        for profile_id, items in breakdown.items()
+    }
+
+_MATERIALS_COST_DISPLAY = _format_cost_breakdown(_MATERIALS_COST_BREAKDOWN)
+_WORKS_COST_DISPLAY = _format_cost_breakdown(_WORKS_COST_BREAKDOWN)
+
+def calculate_materials_cost(basic_dims, profile_id, profile=None):
     """
     Расчет стоимости материалов
 
     Args:
         basic_dims (dict): Словарь с основными размерами. Может содержать основные размеры или сырые значения.
         profile_id (str): Идентификатор профиля КП
+        profile (dict, optional): Уже полученный профиль КП (иначе берется по profile_id)
 
     Returns:
         dict: Словарь со стоимостью материалов и общей стоимостью
     """
     # Получаем профиль КП
-    profile = get_profile(profile_id)
+    if profile is None:
+        profile = get_profile(profile_id)
     if not profile:
         return {"error": "Профиль не найден", "total_cost": 0}
     
     # Получаем фиксированную стоимость материалов из профиля для KP1
     total_materials_cost = profile["costs"]["materials_total"]
     
-    # Создаем форматированные элементы для отображения
-    materials = {}
-    
-    # Для отображения в интерфейсе разбиваем общую стоимость на категории
-    # Эти значения примерные и взяты из КП
-    if profile_id == "kp1":
-        materials = {
-            "Земляные работы": f"{48800:,} руб.".replace(",", " "),
-            "Транспорт": f"{97500:,} руб.".replace(",", " "),
-            "Песок и щебень": f"{17300:,} руб.".replace(",", " "),
-            "Материалы опалубки": f"{144500:,} руб.".replace(",", " "),
-            "Арматура и сопутствующие": f"{177000:,} руб.".replace(",", " "),
-            "Бетон с доставкой": f"{169750:,} руб.".replace(",", " "),
-            "Вспомогательные материалы": f"{162026:,} руб.".replace(",", " ")
-        }
-    elif profile_id == "kp2":
-        # Для KP2 можем просто разделить общую сумму на категории
-        materials = {
-            "Строительные материалы": f"{275000:,} руб.".replace(",", " "),
-            "Отделочные материалы": f"{180000:,} руб.".replace(",", " "),
-            "Вспомогательные материалы": f"{128398:,} руб.".replace(",", " ")
-        }
-    elif profile_id == "kp3":
-        # Для KP3 можем просто разделить общую сумму на категории
-        materials = {
-            "Строительные материалы": f"{180000:,} руб.".replace(",", " "),
-            "Отделочные материалы": f"{90000:,} руб.".replace(",", " "),
-            "Вспомогательные материалы": f"{50631:,} руб.".replace(",", " ")
-        }
+    # Разбивка по категориям для отображения уже отформатирована при импорте
+    materials = _MATERIALS_COST_DISPLAY.get(profile_id, {})
     
     return {
         "materials": materials,
         "total_cost": total_materials_cost,
-        "total_cost_str": f"{total_materials_cost:,} руб.".replace(",", " ")
+        "total_cost_str": _format_rub(total_materials_cost)
     }
 
-def calculate_works_cost(basic_dims, profile_id):
+def calculate_works_cost(basic_dims, profile_id, profile=None):
     """
     Расчет стоимости работ
     
     Args:
         basic_dims (dict): Словарь с основными размерами
         profile_id (str): Идентификатор профиля КП
+        profile (dict, optional): Уже полученный профиль КП (иначе берется по profile_id)
         
     Returns:
         dict: Словарь со стоимостью работ и общей стоимостью
     """
-    # Получаем профиль КП
-    profile = get_profile(profile_id)
-    if not profile:
-        return {"error": "Профиль не найден", "total_cost": 0}
+    # Получаем профиль КП (get_profile всегда возвращает профиль, при неизвестном id - KP1)
+    if profile is None:
+        profile = get_profile(profile_id)
     
     # Получаем фиксированную стоимость работ из профиля для KP1
     total_works_cost = profile["costs"]["works_total"]
     
-    # Создаем форматированные элементы для отображения
-    works = {}
-    
-    # Для отображения в интерфейсе разбиваем общую стоимость на категории
-    # Эти значения примерные и взяты из КП
-    if profile_id == "kp1":
-        works = {
-            "Подготовительные работы": f"{73000:,} руб.".replace(",", " "),
-            "Земляные работы": f"{29000:,} руб.".replace(",", " "),
-            "Бетонирование": f"{177600:,} руб.".replace(",", " "),
-            "Опалубка и армирование": f"{204260:,} руб.".replace(",", " "),
-            "Монтаж закладных": f"{40500:,} руб.".replace(",", " "),
-            "Обратная засыпка": f"{50400:,} руб.".replace(",", " "),
-            "Отделочные работы": f"{252100:,} руб.".replace(",", " "),
-            "Монтаж бортового камня": f"{65000:,} руб.".replace(",", " "),
-            "Разгрузка материалов": f"{30000:,} руб.".replace(",", " ")
-        }
-    elif profile_id == "kp2":
-        # Для KP2 можем просто разделить общую сумму на категории
-        works = {
-            "Подготовительные и земляные работы": f"{120000:,} руб.".replace(",", " "),
-            "Бетонные работы": f"{180000:,} руб.".replace(",", " "),
-            "Опалубка и армирование": f"{105000:,} руб.".replace(",", " "),
-            "Отделочные работы": f"{170690:,} руб.".replace(",", " "),
-            "Монтаж бортового камня": f"{40000:,} руб.".replace(",", " ")
-        }
-    elif profile_id == "kp3":
-        # Для KP3 можем просто разделить общую сумму на категории
-        works = {
-            "Подготовительные и земляные работы": f"{90000:,} руб.".replace(",", " "),
-            "Бетонные работы": f"{104284:,} руб.".replace(",", " "),
-            "Опалубка и армирование": f"{90000:,} руб.".replace(",", " "),
-            "Отделочные работы": f"{110000:,} руб.".replace(",", " ")
-        }
+    # Разбивка по категориям для отображения уже отформатирована при импорте
+    works = _WORKS_COST_DISPLAY.get(profile_id, {})
     
     return {
         "works": works,
         "total_cost": total_works_cost,
-        "total_cost_str": f"{total_works_cost:,} руб.".replace(",", " ")
+        "total_cost_str": _format_rub(total_works_cost)
     }
 
 def calculate_fixed_services():
@@ -684,93 +822,6 @@ def calculate_fixed_services():
         "Доставка материалов": "25000 ₽"
     }
 
-def calculate_materials(length, width, depth, wall_thickness):
-    """Расчет необходимых материалов"""
-    # Переводим в метры
-    l, w, d = length/1000, width/1000, depth/1000
-    wt = wall_thickness/1000
-    
-    # Объем бетона М300 для чаши (в м³)
-    # Наружные размеры дна
-    outer_length = l + 2*wt
-    outer_width = w + 2*wt
-    bottom_concrete = outer_length * outer_width * wt
-    
-    # Стены - учитываем 2 стены по наружным размерам
-    wall_length = (2 * (outer_length + outer_width)) * d * wt
-    
-    # Бортики
-    border_height = 0.15  # высота бортика 150мм
-    border_width = 0.3   # ширина бортика 300мм
-    border_length = (outer_length + outer_width) * 2
-    border_volume = border_length * border_height * border_width
-    
-    total_concrete_m300 = bottom_concrete + wall_length + border_volume
-    
-    # Бетон М200 для подбетонки (в м³)
-    base_concrete_thickness = 0.1  # 10 см
-    base_concrete = (outer_length + 1.2) * (outer_width + 1.2) * base_concrete_thickness  # +600мм с каждой стороны
-    
-    # Арматура (в тоннах)
-    # Площадь армирования - дно + стены с двойным каркасом
-    rebar_bottom = outer_length * outer_width
-    rebar_walls = (2 * (outer_length + outer_width)) * (d + border_height)
-    total_rebar_area = rebar_bottom + rebar_walls
-    rebar_weight = (total_rebar_area * 50) / 1000  # 50 кг/м² при двойном армировании
-    
-    # Фанера (в листах)
-    formwork_area = total_rebar_area * 1.2  # +20% на распил
-    sheet_area = 1.52 * 1.52  # размер листа 1520x1520
-    plywood_sheets = math.ceil(formwork_area / sheet_area)
-    
-    return {
-        "Бетон M200 (подбетонка)": f"{base_concrete:.1f} м³",
-        "Бетон М300 (чаша)": f"{total_concrete_m300:.1f} м³",
-        "Общий объем бетона": f"{base_concrete + total_concrete_m300:.1f} м³",
-        "Арматура": f"{rebar_weight:.1f} тонн",
-        "Количество фанеры": f"{plywood_sheets} листов",
-        "Площадь опалубки": f"{formwork_area:.1f} м²"
-    }
-
-def calculate_costs(basic_dims, materials):
-    """Расчет стоимости на основе КП"""
-    costs = {
-        "Работы": {
-            "Разметка и подготовка": 9600,
-            "Земляные работы": 21000,
-            "Бетонные работы": 98250,
-            "Отделочные работы": 26130,
-            "Монтаж оборудования": 115000
-        },
-        "Материалы": {
-            "Бетон М200": float(materials["Бетон M200 (подбетонка)"].split()[0]) * 4350,
-            "Бетон М300": float(materials["Бетон М300 (чаша)"].split()[0]) * 5500,
-            "Арматура": float(materials["Арматура"].split()[0]) * 54500,
-            "Фанера": int(materials["Количество фанеры"].split()[0]) * 1730,
-            "Прочие материалы": 35000
-        },
-        "Оборудование": {
-            "Фильтрация": 38208,
-            "Освещение": 26376,
-            "Автоматика": 30000,
-            "Монтаж": 115000
-        }
-    }
-    
-    total_works = sum(costs["Работы"].values())
-    total_materials = sum(costs["Материалы"].values())
-    total_equipment = sum(costs["Оборудование"].values())
-    
-    return {
-        "Работы": costs["Работы"],
-        "Материалы": costs["Материалы"],
-        "Оборудование": costs["Оборудование"],
-        "Итого работы": total_works,
-        "Итого материалы": total_materials,
-        "Итого оборудование": total_equipment,
-        "ИТОГО": total_works + total_materials + total_equipment
-    }
-
 def calculate_fixed_values():
     """Возвращает фиксированные значения из КП"""
     return {
@@ -866,7 +917,79 @@ def calculate_fixed_values():
         "total_cost": 2899664  # Фиксированная итоговая стоимость из КП
     }
 
-def calculate_kp_items(length, width, depth, pool_type, profile_id="kp1"):
+# Позиции КП в формате ООО "ДОН БАСС": наименование, единица измерения, количество, цена.
+# Количество None означает, что оно зависит от размеров бассейна и вычисляется
+# в calculate_kp_items; остальные позиции собираются один раз при импорте.
+_KP_EQUIPMENT_ROWS = (
+    ("Фильтрационная установка Hayward PWL D611 81073 (14m3/h, верх)", "шт.", 1, 79975.00),
+    ("Скиммер под лайнер Aquaviva Wide EM0020V", "шт.", None, 9115.00),  # Зависит от периметра
+    ("Форсунка стеновая под лайнер Aquaviva EM4414 (50 мм/2\" сопло \"круг\", латунные вставки", "шт.", None, 1979.00),  # Зависит от периметра
+    ("Слив донный под лайнер Aquaviva EM2837", "шт.", 1, 4727.00),
+    ("Прожектор светодиодный Aquaviva LED003 546LED (36 Вт) White", "шт.", 2, 26129.00),
+    ("Трансформатор Aquant 105 Вт-12В", "шт.", 1, 6256.00),
+    ("Дозовая коробка Aquaviva EM2823", "шт.", 2, 1078.00),
+    ("Песок кварцевый 25кг Aquaviva 0,5-0,8 мм", "шт.", 6, 1152.00),
+    ("Набор химии для запуска бассейна", "компл", 1, 12318.00),
+    ("Набор для ухода за бассейном", "компл", 1, 17580.00),
+    ("Инсталляция (трубы, краны, фитинги)", "компл", 1, 102000.00),
+    ("Щит Электра контроля", "компл", 1, 48000.00),
+    ("Теплообменник Elecro G2 HE 49 кВт (титан)", "шт.", 1, 84800.00),
+    ("Теплообменник Elecro 18 кВт Space Heater (пластик)", "шт.", 1, 33200.00),
+    ("Установка обеззараживания Sonda Salt 20", "шт.", 1, 139000.00),
+    ("Автоматическая станция контроля и дозирования Bayrol Pool Manager PRO", "шт.", 1, 186000.00),
+    ("Монтаж и наладка оборудования, запуск", "услуга", 1, 186000.00)
+)
+
+_KP_MATERIALS_ROWS = (
+    ("Выемка грунта под бассейн механизированным способом", "м3", None, 400.00),
+    ("Вывоз чистого грунта с территории участка", "КамАЗ", None, 6500.00),
+    ("Песок по факту с доставкой 6 м3", "шт.", None, 7600.00),
+    ("Щебень по факту с доставкой 10 т", "шт.", None, 9700.00),
+    ("Бетон М200 для подбетонки с доставкой", "м3", None, 5750.00),
+    ("Бетон М300 для чаши бассейна с доставкой", "м3", None, 6650.00),
+    ("Арматура диаметром 10 мм", "т", None, 65000.00)
+)
+
+_KP_WORKS_ROWS = (
+    ("Разметка бассейна для техники, нивелировка, привязка к территории по всем этапам работ", "м2", None, 600.00),
+    ("Вязка арматуры для чаши бассейна", "м2", None, 1750.00),
+    ("Устройство опалубки с применением гидрофобной фанеры", "м2", None, 550.00),
+    ("Приемка и заливка бетоном М200 подбетонки", "м3", None, 1200.00),
+    ("Приемка и заливка бетоном М300 чаши", "м3", None, 3500.00),
+    ("Разгрузка и подноска строительных материалов", "услуга", 1, 30000.00)
+)
+
+def _prebuild_kp_items(rows):
+    """Собирает словари позиций КП с фиксированным количеством (для остальных - None)"""
+    return tuple(
+        None if qty is None else {"name": name, "unit": unit, "qty": qty, "price": price}
+        for name, unit, qty, price in rows
+    )
+
+_KP_EQUIPMENT_ITEMS = _prebuild_kp_items(_KP_EQUIPMENT_ROWS)
+_KP_MATERIALS_ITEMS = _prebuild_kp_items(_KP_MATERIALS_ROWS)
+_KP_WORKS_ITEMS = _prebuild_kp_items(_KP_WORKS_ROWS)
+
+# Эталонные размеры из КП №1 (8000x4000x1500)
+_KP_REFERENCE_SURFACE = 32.0  # м²
+_KP_REFERENCE_PERIMETER = 26.0  # м/п
+_KP_REFERENCE_VOLUME = 48.0  # м³
+_KP_REFERENCE_AREA = 71.6  # м²
+
+def _build_kp_items(rows, prebuilt_items, qtys):
+    """
+    Собирает список позиций КП для ответа
+    
+    Готовые словари фиксированных позиций используются всеми запросами совместно
+    и не должны изменяться; для позиций без количества оно берется по порядку из qtys.
+    """
+    qtys = iter(qtys)
+    return [
+        item if item is not None else {"name": name, "unit": unit, "qty": next(qtys), "price": price}
+        for (name, unit, _, price), item in zip(rows, prebuilt_items)
+    ]
+
+def calculate_kp_items(length, width, depth, pool_type, profile_id="kp1", profile=None):
     """Расчет позиций для коммерческого предложения в формате ООО "ДОН БАСС" 
     
     Args:
@@ -875,19 +998,21 @@ def calculate_kp_items(length, width, depth, pool_type, profile_id="kp1"):
         depth (float): Глубина бассейна в мм
         pool_type (str): Тип бассейна (liner, tile, mosaic)
         profile_id (str): Идентификатор профиля КП
+        profile (dict, optional): Уже полученный профиль КП (иначе берется по profile_id)
         
     Returns:
         dict: Словарь с позициями КП и итоговыми суммами
     """
     # Получаем профиль КП
     try:
-        profile = get_profile(profile_id)
+        if profile is None:
+            profile = get_profile(profile_id)
         if not profile:
-            logging.warning(f"Профиль {profile_id} не найден, используется KP1")
+            app.logger.warning("Профиль %s не найден, используется KP1", profile_id)
             profile = get_profile("kp1")
             profile_id = "kp1"
     except Exception as e:
-        logging.error(f"Ошибка при получении профиля: {e}")
+        app.logger.error("Ошибка при получении профиля: %s", e)
         profile = get_profile("kp1")
         profile_id = "kp1"
     
@@ -908,17 +1033,11 @@ def calculate_kp_items(length, width, depth, pool_type, profile_id="kp1"):
     finishing_area = water_surface + wall_area
     water_volume = water_surface * depth_m
     
-    # Эталонные размеры из КП №1 (8000x4000x1500)
-    reference_surface = 32.0  # м²
-    reference_perimeter = 26.0  # м/п
-    reference_volume = 48.0  # м³
-    reference_area = 71.6  # м²
-    
-    # Коэффициенты масштабирования относительно эталонных размеров
-    surface_ratio = water_surface / reference_surface
-    perimeter_ratio = perimeter / reference_perimeter
-    volume_ratio = water_volume / reference_volume
-    area_ratio = finishing_area / reference_area
+    # Коэффициенты масштабирования относительно эталонных размеров КП №1
+    surface_ratio = water_surface / _KP_REFERENCE_SURFACE
+    perimeter_ratio = perimeter / _KP_REFERENCE_PERIMETER
+    volume_ratio = water_volume / _KP_REFERENCE_VOLUME
+    area_ratio = finishing_area / _KP_REFERENCE_AREA
     
     # Рассчитываем коэффициенты масштабирования для основных категорий затрат
     # Материалы - зависят от объема и площади
@@ -930,113 +1049,10 @@ def calculate_kp_items(length, width, depth, pool_type, profile_id="kp1"):
     
     # Используем те же наименования, что в КП ООО "ДОН БАСС"
     # Оборудование - количество почти не зависит от размеров
-    equipment_items = [
-        {
-            "name": "Фильтрационная установка Hayward PWL D611 81073 (14m3/h, верх)",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 79975.00
-        },
-        {
-            "name": "Скиммер под лайнер Aquaviva Wide EM0020V",
-            "unit": "шт.",
-            "qty": max(1, round(perimeter_ratio)),  # Количество скиммеров зависит от периметра
-            "price": 9115.00
-        },
-        {
-            "name": "Форсунка стеновая под лайнер Aquaviva EM4414 (50 мм/2\" сопло \"круг\", латунные вставки",
-            "unit": "шт.",
-            "qty": max(2, round(perimeter_ratio * 2)),  # Количество форсунок зависит от периметра
-            "price": 1979.00
-        },
-        {
-            "name": "Слив донный под лайнер Aquaviva EM2837",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 4727.00
-        },
-        {
-            "name": "Прожектор светодиодный Aquaviva LED003 546LED (36 Вт) White",
-            "unit": "шт.",
-            "qty": 2,
-            "price": 26129.00
-        },
-        {
-            "name": "Трансформатор Aquant 105 Вт-12В",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 6256.00
-        },
-        {
-            "name": "Дозовая коробка Aquaviva EM2823",
-            "unit": "шт.",
-            "qty": 2,
-            "price": 1078.00
-        },
-        {
-            "name": "Песок кварцевый 25кг Aquaviva 0,5-0,8 мм",
-            "unit": "шт.",
-            "qty": 6,
-            "price": 1152.00
-        },
-        {
-            "name": "Набор химии для запуска бассейна",
-            "unit": "компл",
-            "qty": 1,
-            "price": 12318.00
-        },
-        {
-            "name": "Набор для ухода за бассейном",
-            "unit": "компл",
-            "qty": 1,
-            "price": 17580.00
-        },
-        {
-            "name": "Инсталляция (трубы, краны, фитинги)",
-            "unit": "компл",
-            "qty": 1,
-            "price": 102000.00
-        },
-        {
-            "name": "Щит Электра контроля",
-            "unit": "компл",
-            "qty": 1,
-            "price": 48000.00
-        },
-        {
-            "name": "Теплообменник Elecro G2 HE 49 кВт (титан)",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 84800.00
-        },
-        {
-            "name": "Теплообменник Elecro 18 кВт Space Heater (пластик)",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 33200.00
-        },
-        {
-            "name": "Установка обеззараживания Sonda Salt 20",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 139000.00
-        },
-        {
-            "name": "Автоматическая станция контроля и дозирования Bayrol Pool Manager PRO",
-            "unit": "шт.",
-            "qty": 1,
-            "price": 186000.00
-        },
-        {
-            "name": "Монтаж и наладка оборудования, запуск",
-            "unit": "услуга",
-            "qty": 1,
-            "price": 186000.00
-        }
-    ]
-    
-    # Рассчитываем общую стоимость оборудования
-    calculated_equipment_total = sum(item["qty"] * item["price"] for item in equipment_items)
+    equipment_qtys = (
+        max(1, round(perimeter_ratio)),  # Количество скиммеров зависит от периметра
+        max(2, round(perimeter_ratio * 2))  # Количество форсунок зависит от периметра
+    )
     
     # Приводим к эталонной стоимости из КП с учетом коэффициента масштабирования
     equipment_total = round(reference_equipment * equipment_scale)
@@ -1047,185 +1063,168 @@ def calculate_kp_items(length, width, depth, pool_type, profile_id="kp1"):
     
     # Материалы - зависят от объема, площади и периметра
     # Показываем основные позиции материалов, но итоговая сумма берется из расчета выше
-    materials_items = [
-        {
-            "name": "Выемка грунта под бассейн механизированным способом",
-            "unit": "м3",
-            "qty": round(122 * volume_ratio),  # Зависит от объема
-            "price": 400.00
-        },
-        {
-            "name": "Вывоз чистого грунта с территории участка",
-            "unit": "КамАЗ",
-            "qty": max(1, round(15 * volume_ratio)),  # Зависит от объема
-            "price": 6500.00
-        },
-        {
-            "name": "Песок по факту с доставкой 6 м3",
-            "unit": "шт.",
-            "qty": max(1, round(volume_ratio)),
-            "price": 7600.00
-        },
-        {
-            "name": "Щебень по факту с доставкой 10 т",
-            "unit": "шт.",
-            "qty": max(1, round(volume_ratio)),
-            "price": 9700.00
-        },
-        {
-            "name": "Бетон М200 для подбетонки с доставкой",
-            "unit": "м3",
-            "qty": round(3.6 * surface_ratio, 1),  # Зависит от площади
-            "price": 5750.00
-        },
-        {
-            "name": "Бетон М300 для чаши бассейна с доставкой",
-            "unit": "м3",
-            "qty": round(14.6 * volume_ratio, 1),  # Зависит от объема
-            "price": 6650.00
-        },
-        {
-            "name": "Арматура диаметром 10 мм",
-            "unit": "т",
-            "qty": round(1.8 * area_ratio, 1),  # Зависит от площади отделки
-            "price": 65000.00
-        }
-    ]
+    materials_qtys = (
+        round(122 * volume_ratio),  # Зависит от объема
+        max(1, round(15 * volume_ratio)),  # Зависит от объема
+        max(1, round(volume_ratio)),
+        max(1, round(volume_ratio)),
+        round(3.6 * surface_ratio, 1),  # Зависит от площади
+        round(14.6 * volume_ratio, 1),  # Зависит от объема
+        round(1.8 * area_ratio, 1)  # Зависит от площади отделки
+    )
     
     # Работы - зависят от площади, объема и периметра
-    works_items = [
-        {
-            "name": "Разметка бассейна для техники, нивелировка, привязка к территории по всем этапам работ",
-            "unit": "м2",
-            "qty": round(water_surface * 1.7),  # Зависит от площади
-            "price": 600.00
-        },
-        {
-            "name": "Вязка арматуры для чаши бассейна",
-            "unit": "м2",
-            "qty": round(finishing_area),  # Зависит от общей площади
-            "price": 1750.00
-        },
-        {
-            "name": "Устройство опалубки с применением гидрофобной фанеры",
-            "unit": "м2",
-            "qty": round(wall_area * 2.2),  # Зависит от площади стен (внутренняя + внешняя)
-            "price": 550.00
-        },
-        {
-            "name": "Приемка и заливка бетоном М200 подбетонки",
-            "unit": "м3",
-            "qty": round(3.6 * surface_ratio, 1),  # Зависит от площади
-            "price": 1200.00
-        },
-        {
-            "name": "Приемка и заливка бетоном М300 чаши",
-            "unit": "м3",
-            "qty": round(14.6 * volume_ratio, 1),  # Зависит от объема
-            "price": 3500.00
-        },
-        {
-            "name": "Разгрузка и подноска строительных материалов",
-            "unit": "услуга",
-            "qty": 1,
-            "price": 30000.00
-        }
-    ]
+    works_qtys = (
+        round(water_surface * 1.7),  # Зависит от площади
+        round(finishing_area),  # Зависит от общей площади
+        round(wall_area * 2.2),  # Зависит от площади стен (внутренняя + внешняя)
+        round(3.6 * surface_ratio, 1),  # Зависит от площади
+        round(14.6 * volume_ratio, 1)  # Зависит от объема
+    )
     
     # Рассчитываем общую стоимость
     total_cost = equipment_total + materials_total + works_total
     
     return {
-        "equipment_items": equipment_items,
+        "equipment_items": _build_kp_items(_KP_EQUIPMENT_ROWS, _KP_EQUIPMENT_ITEMS, equipment_qtys),
         "equipment_total": equipment_total,
-        "materials_items": materials_items,
+        "materials_items": _build_kp_items(_KP_MATERIALS_ROWS, _KP_MATERIALS_ITEMS, materials_qtys),
         "materials_total": materials_total,
-        "works_items": works_items,
+        "works_items": _build_kp_items(_KP_WORKS_ROWS, _KP_WORKS_ITEMS, works_qtys),
         "works_total": works_total,
         "total_cost": total_cost
     }
 
-def num2text(num):
-    """Конвертация числа в текстовый формат"""
-    units = (
-        'ноль', 'один', 'два', 'три', 'четыре', 'пять', 'шесть',
-        'семь', 'восемь', 'девять'
-    )
-    teens = (
-        'десять', 'одиннадцать', 'двенадцать', 'тринадцать', 'четырнадцать',
-        'пятнадцать', 'шестнадцать', 'семнадцать', 'восемнадцать', 'девятнадцать'
-    )
-    tens = (
-        'двадцать', 'тридцать', 'сорок', 'пятьдесят', 'шестьдесят',
-        'семьдесят', 'восемьдесят', 'девяносто'
-    )
-    hundreds = (
-        'сто', 'двести', 'триста', 'четыреста', 'пятьсот', 'шестьсот',
-        'семьсот', 'восемьсот', 'девятьсот'
-    )
+_NUM2TEXT_UNITS = (
+    'ноль', 'один', 'два', 'три', 'четыре', 'пять', 'шесть',
+    'семь', 'восемь', 'девять'
+)
+_NUM2TEXT_TEENS = (
+    'десять', 'одиннадцать', 'двенадцать', 'тринадцать', 'четырнадцать',
+    'пятнадцать', 'шестнадцать', 'семнадцать', 'восемнадцать', 'девятнадцать'
+)
+_NUM2TEXT_TENS = (
+    'двадцать', 'тридцать', 'сорок', 'пятьдесят', 'шестьдесят',
+    'семьдесят', 'восемьдесят', 'девяносто'
+)
+_NUM2TEXT_HUNDREDS = (
+    'сто', 'двести', 'триста', 'четыреста', 'пятьсот', 'шестьсот',
+    'семьсот', 'восемьсот', 'девятьсот'
+)
+
+def _convert_group(num, feminine=False):
+    """Преобразовать число 0..999 в слова (используется для построения таблиц)
     
-    def _convert_group(num):
-        s = ''
-        if num >= 100:
-            s += hundreds[num // 100 - 1] + ' '
-            num %= 100
-        
-        if num >= 20:
-            s += tens[num // 10 - 2] + ' '
-            num %= 10
+    Args:
+        num (int): число 0..999
+        feminine (bool): женский род для единиц ("одна тысяча", "две тысячи")
+    """
+    words = []
+    if num >= 100:
+        words.append(_NUM2TEXT_HUNDREDS[num // 100 - 1])
+        num %= 100
+    
+    if num >= 20:
+        words.append(_NUM2TEXT_TENS[num // 10 - 2])
+        num %= 10
+    
+    if num >= 10:
+        words.append(_NUM2TEXT_TEENS[num - 10])
+    elif num > 0:
+        if feminine and num <= 2:
+            words.append(('одна', 'две')[num - 1])
+        else:
+            words.append(_NUM2TEXT_UNITS[num])
         
-        if num >= 10:
-            s += teens[num - 10] + ' '
-        elif num > 0:
-            s += units[num] + ' '
-            
-        return s.strip()
-    
-    if num == 0:
-        return 'ноль рублей ноль копеек'
+    return ' '.join(words)
+
+def _plural_form(num):
+    """Форма окончания для числа: 0 - "один рубль", 1 - "два рубля", 2 - "пять рублей" """
+    if num % 10 == 1 and num % 100 != 11:
+        return 0
+    if 2 <= num % 10 <= 4 and (num % 100 < 10 or num % 100 >= 20):
+        return 1
+    return 2
+
+# Форма окончания зависит только от двух последних цифр
+_PLURAL_FORM = bytes(_plural_form(i) for i in range(100))
+_RUBLE_WORDS = ('рубль', 'рубля', 'рублей')
+_KOPECK_WORDS = ('копейка', 'копейки', 'копеек')
+
+# Разряды (тысячи, миллионы, миллиарды): формы названия и род числительного
+_NUM2TEXT_SCALES = (
+    (('тысяча', 'тысячи', 'тысяч'), True),
+    (('миллион', 'миллиона', 'миллионов'), False),
+    (('миллиард', 'миллиарда', 'миллиардов'), False),
+)
+
+# Слова для всех групп 0..999 (мужской и женский род) считаются один раз при импорте
+_GROUP_WORDS = tuple(_convert_group(i) for i in range(1000))
+_GROUP_WORDS_FEMININE = tuple(_convert_group(i, feminine=True) for i in range(1000))
+
+@lru_cache(maxsize=512)
+def num2text(num):
+    """Сумма прописью: рубли словами, копейки двумя цифрами (повторяющиеся суммы берутся из кэша)
     
+    Args:
+        num (float): сумма в рублях
+        
+    Returns:
+        str: например "Два миллиона рублей 00 копеек"
+    """
     # Разделяем целую и дробную части
     rub, kop = divmod(round(num * 100), 100)
     
-    # Обрабатываем рубли
-    text = ''
-    if rub > 0:
-        for unit_index, unit_name in enumerate(('', 'тысяч', 'миллион', 'миллиард')):
-            _num = rub % 1000
-            if _num > 0:
-                group_text = _convert_group(_num)
-                if unit_index > 0:
-                    if _num % 10 == 1 and _num % 100 != 11:
-                        unit_text = unit_name + 'а'
-                    elif 2 <= _num % 10 <= 4 and (_num % 100 < 10 or _num % 100 >= 20):
-                        unit_text = unit_name + 'и'
-                    else:
-                        unit_text = unit_name
-                    text = group_text + ' ' + unit_text + ' ' + text
-                else:
-                    text = group_text + ' ' + text
-            rub //= 1000
-        
-        # Добавляем слово "рублей" с правильным окончанием
-        if rub % 10 == 1 and rub % 100 != 11:
-            text += 'рубль'
-        elif 2 <= rub % 10 <= 4 and (rub % 100 < 10 or rub % 100 >= 20):
-            text += 'рубля'
-        else:
-            text += 'рублей'
-    
-    # Добавляем копейки
-    if kop > 0:
-        text += ' ' + str(kop) + ' копеек'
+    # Рубли: группы по три цифры от младшей к старшей, затем в обратном порядке
+    if rub == 0:
+        words = ['ноль']
     else:
-        text += ' ноль копеек'
-    
-    return text.capitalize()
+        groups = []
+        group = rub % 1000
+        if group:
+            groups.append(_GROUP_WORDS[group])
+        rest = rub // 1000
+        for forms, feminine in _NUM2TEXT_SCALES:
+            group = rest % 1000
+            if group:
+                group_words = (_GROUP_WORDS_FEMININE if feminine else _GROUP_WORDS)[group]
+                groups.append(group_words + ' ' + forms[_PLURAL_FORM[group % 100]])
+            rest //= 1000
+        words = groups[::-1]
+    
+    # Окончание "рубль/рубля/рублей" определяется по всей целой части
+    words.append(_RUBLE_WORDS[_PLURAL_FORM[rub % 100]])
+    
+    # Копейки всегда двумя цифрами с согласованным словом
+    words.append('%02d %s' % (kop, _KOPECK_WORDS[_PLURAL_FORM[kop]]))
+    
+    return ' '.join(words).capitalize()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Обязательные параметры /calculate в порядке аргументов calculate()
+_CALCULATE_PARAMS = ("length", "width", "depth", "wall_thickness")
+
+# Тела типовых ответов об ошибках сериализуются один раз при импорте; объект
+# Response создается на каждый запрос, т.к. after_request-обработчики (CORS) его дополняют
+_ERROR_NO_JSON = _json_bytes({"error": "Отсутствуют данные JSON"})
+_ERROR_NO_DATA = _json_bytes({"error": "Не получены данные"})
+_ERROR_NOT_POSITIVE = _json_bytes({"error": "Все параметры должны быть положительными числами"})
+_ERROR_BAD_INPUT = _json_bytes({"error": "Некорректные входные данные: параметры должны быть числами"})
+
+def _error_response(payload):
+    """Ответ 400 с заранее сериализованным JSON-телом ошибки"""
+    return app.response_class(payload, status=400, mimetype="application/json")
+
+def _all_positive(*values):
+    """Проверка, что все размеры (уже приведенные к float) - конечные числа больше нуля; NaN и inf не проходят"""
+    for value in values:
+        if not (isfinite(value) and value > 0):
+            return False
+    return True
+
 @app.route('/calculate', methods=['POST'])
 def calculate_route():
     """
@@ -1245,18 +1244,14 @@ def calculate_route():
         app.logger.debug('Received data: %s', data)
         
         if not data:
-            return jsonify({"error": "Отсутствуют данные JSON"}), 400
+            return _error_response(_ERROR_NO_JSON)
         
-        # Проверяем наличие всех необходимых параметров
-        required_params = ["length", "width", "depth", "wall_thickness"]
-        for param in required_params:
-            if param not in data:
-                return jsonify({"error": f"Отсутствует параметр {param}"}), 400
+        # Проверяем наличие всех необходимых параметров (первый отсутствующий - в ответ)
+        missing = next((param for param in _CALCULATE_PARAMS if param not in data), None)
+        if missing is not None:
+            return jsonify({"error": f"Отсутствует параметр {missing}"}), 400
         
-        length = float(data["length"])
-        width = float(data["width"])
-        depth = float(data["depth"])
-        wall_thickness = float(data["wall_thickness"])
+        length, width, depth, wall_thickness = [float(data[param]) for param in _CALCULATE_PARAMS]
         
         # Обрабатываем разные варианты имени параметра для профиля
         profile_id = data.get("profile_id", None)
@@ -1278,22 +1273,82 @@ def calculate_route():
         if not profile_id:
             profile_id = "kp1"
         
+        # Идентификатор профиля входит в ключ кэша, поэтому приводим его к строке
+        profile_id = _cache_profile_id(profile_id)
+        
         app.logger.debug('Using profile_id: %s', profile_id)
         
-        # Вызываем функцию расчета
-        result = calculate(length, width, depth, wall_thickness, profile_id)
+        # Вызываем функцию расчета (повторные запросы с теми же размерами берутся из кэша
+        # вместе с уже сериализованным ответом)
+        result, payload = _calculate_cached(length, width, depth, wall_thickness, profile_id)
         
         if "error" in result:
             return jsonify({"error": result["error"]}), 400
         
-        return jsonify(result)
+        return app.response_class(payload, mimetype="application/json")
     
     except ValueError as e:
         return jsonify({"error": f"Ошибка преобразования типов: {str(e)}"}), 400
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception('Unexpected error in /calculate')
         return jsonify({"error": str(e)}), 500
 
+# Максимальное число конфигураций в одном запросе /calculate_batch
+_BATCH_MAX_SIZE = 5000
+
+@app.route('/calculate_batch', methods=['POST'])
+def calculate_batch_route():
+    """
+    Пакетный расчет объемов для нескольких конфигураций бассейна
+    
+    Ожидает данные в формате JSON (списки одинаковой длины):
+    {
+        "length": [float, ...], // длины бассейнов в мм
+        "width": [float, ...], // ширины бассейнов в мм
+        "depth": [float, ...], // глубины бассейнов в мм
+        "wall_thickness": [float, ...] // толщины стенок в мм
+    }
+    
+    Длина каждого списка - не более _BATCH_MAX_SIZE элементов.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict):
+            return _error_response(_ERROR_NO_JSON)
+        
+        columns = []
+        for param in ["length", "width", "depth", "wall_thickness"]:
+            values = data.get(param)
+            if not isinstance(values, list):
+                return jsonify({"error": f"Параметр {param} должен быть списком"}), 400
+            if len(values) > _BATCH_MAX_SIZE:
+                return jsonify({"error": f"Параметр {param} содержит больше {_BATCH_MAX_SIZE} значений"}), 400
+            columns.append([float(x) for x in values])
+        
+        if len({len(column) for column in columns}) != 1:
+            return jsonify({"error": "Списки параметров должны быть одинаковой длины"}), 400
+        
+        if not all(_all_positive(*column) for column in columns):
+            return jsonify({"error": "Все размеры должны быть положительными числами"}), 400
+        
+        return jsonify(calculate_batch(*columns))
+    
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Ошибка преобразования типов: {str(e)}"}), 400
+    except OverflowError:
+        return jsonify({"error": "Размеры слишком велики для расчета"}), 400
+
+# Размеры, которые сравниваются с КП
+_COMPARE_DIMENSION_KEYS = ("water_surface", "perimeter", "wall_area", "finishing_area", "water_volume")
+
+# Стоимости для сравнения: (ключ в ответе, ключ в расчете, ключ в данных КП)
+_COMPARE_COST_KEYS = (
+    ("materials", "materials_total", "materials_cost"),
+    ("work", "works_total", "work_cost"),
+    ("equipment", "equipment_total", "equipment_cost"),
+    ("total", "total", "total_cost"),
+)
+
 @app.route('/compare_estimate', methods=['POST'])
 def compare_estimate():
     """
@@ -1357,9 +1412,9 @@ def compare_estimate():
         if not estimate_data:
             app.logger.warning('No estimate data provided')
         
-        # Выполняем расчет с нашими алгоритмами
+        # Выполняем расчет с нашими алгоритмами (общий кэш с /calculate, результат только читается)
         try:
-            calc_result = calculate(length, width, depth, wall_thickness, profile_id)
+            calc_result, _ = _calculate_cached(length, width, depth, wall_thickness, _cache_profile_id(profile_id))
         except Exception as calc_error:
             app.logger.error('Error during calculation: %s', str(calc_error), exc_info=True)
             return jsonify({"success": False, "error": f"Ошибка при расчете: {str(calc_error)}"}), 500
@@ -1375,118 +1430,57 @@ def compare_estimate():
             except (ValueError, AttributeError):
                 return 0
         
-        # Вспомогательная функция для безопасного извлечения числа из строки с единицами измерения
-        def safe_extract_measurement(string_value):
-            if string_value is None:
-                return 0
-            try:
-                if isinstance(string_value, (int, float)):
-                    return float(string_value)
-                    
-                # Извлекаем число из строки вида "32.0 м²"
-                parts = string_value.split()
-                if parts and parts[0]:
-                    return float(parts[0].replace(',', '.'))
-                return 0
-            except (ValueError, AttributeError, IndexError):
-                app.logger.warning('Failed to extract measurement from: %s', string_value)
-                return 0
-                
-        # Сравниваем размеры
-        dimensions_comparison = {}
-        
-        # Извлекаем значения из calc_result и estimate_data с обработкой ошибок
+        # Берем числовые значения из calc_result (с той же точностью, что и в отображении)
         try:
-            calc_water_surface = safe_extract_measurement(calc_result["basic_dimensions"].get("Площадь водного зеркала", "0"))
-            calc_perimeter = safe_extract_measurement(calc_result["basic_dimensions"].get("Периметр", "0"))
-            calc_wall_area = safe_extract_measurement(calc_result["basic_dimensions"].get("Площадь стен", "0"))
-            calc_finishing_area = safe_extract_measurement(calc_result["basic_dimensions"].get("Площадь отделки", "0"))
-            calc_water_volume = safe_extract_measurement(calc_result["basic_dimensions"].get("Объем воды", "0"))
+            raw_dims = calc_result["basic_dimensions"]["_raw"]
+            calc_dims = {key: round(getattr(raw_dims, key), 1) for key in _COMPARE_DIMENSION_KEYS}
         except Exception as e:
             app.logger.error('Error extracting calculated dimensions: %s', str(e), exc_info=True)
             return jsonify({"success": False, "error": f"Ошибка при извлечении размеров: {str(e)}"}), 500
         
-        # Извлекаем значения из estimate_data
+        # Извлекаем значения из estimate_data (каждое значение разбирается один раз)
         try:
-            estimate_water_surface = safe_extract_float(estimate_data.get("water_surface", 0))
-            estimate_perimeter = safe_extract_float(estimate_data.get("perimeter", 0))
-            estimate_wall_area = safe_extract_float(estimate_data.get("wall_area", 0))
-            estimate_finishing_area = safe_extract_float(estimate_data.get("finishing_area", 0))
-            estimate_water_volume = safe_extract_float(estimate_data.get("water_volume", 0))
+            estimate_dims = {key: safe_extract_float(estimate_data.get(key, 0)) for key in _COMPARE_DIMENSION_KEYS}
         except Exception as e:
             app.logger.error('Error extracting estimate dimensions: %s', str(e), exc_info=True)
             return jsonify({"success": False, "error": f"Ошибка при извлечении размеров из КП: {str(e)}"}), 500
             
         # Формируем сравнение размеров
-        dimensions_comparison = {
-            "water_surface": {
-                "calc": calc_water_surface,
-                "estimate": estimate_water_surface,
-                "diff": round(calc_water_surface - estimate_water_surface, 2)
-            },
-            "perimeter": {
-                "calc": calc_perimeter,
-                "estimate": estimate_perimeter,
-                "diff": round(calc_perimeter - estimate_perimeter, 2)
-            },
-            "wall_area": {
-                "calc": calc_wall_area,
-                "estimate": estimate_wall_area,
-                "diff": round(calc_wall_area - estimate_wall_area, 2)
-            },
-            "finishing_area": {
-                "calc": calc_finishing_area,
-                "estimate": estimate_finishing_area,
-                "diff": round(calc_finishing_area - estimate_finishing_area, 2)
-            },
-            "water_volume": {
-                "calc": calc_water_volume,
-                "estimate": estimate_water_volume,
-                "diff": round(calc_water_volume - estimate_water_volume, 2)
+        dimensions_comparison = {}
+        for key in _COMPARE_DIMENSION_KEYS:
+            calc_value = calc_dims[key]
+            estimate_value = estimate_dims[key]
+            dimensions_comparison[key] = {
+                "calc": calc_value,
+                "estimate": estimate_value,
+                "diff": round(calc_value - estimate_value, 2)
             }
-        }
         
         # Сравниваем стоимость
         try:
-            calc_materials = calc_result["costs"]["materials_total"]
-            calc_works = calc_result["costs"]["works_total"]
-            calc_equipment = calc_result["costs"]["equipment_total"]
-            calc_total = calc_result["costs"]["total"]
+            calc_costs = {name: calc_result["costs"][calc_key] for name, calc_key, _ in _COMPARE_COST_KEYS}
         except KeyError as e:
             app.logger.error('Missing cost key in calculation result: %s', str(e), exc_info=True)
             return jsonify({"success": False, "error": f"Ошибка при извлечении стоимости: {str(e)}"}), 500
             
         try:
-            estimate_materials = safe_extract_float(estimate_data.get("materials_cost", 0))
-            estimate_works = safe_extract_float(estimate_data.get("work_cost", 0))
-            estimate_equipment = safe_extract_float(estimate_data.get("equipment_cost", 0))
-            estimate_total = safe_extract_float(estimate_data.get("total_cost", 0))
+            estimate_costs = {
+                name: safe_extract_float(estimate_data.get(estimate_key, 0))
+                for name, _, estimate_key in _COMPARE_COST_KEYS
+            }
         except Exception as e:
             app.logger.error('Error extracting estimate costs: %s', str(e), exc_info=True)
             return jsonify({"success": False, "error": f"Ошибка при извлечении стоимости из КП: {str(e)}"}), 500
         
-        costs_comparison = {
-            "materials": {
-                "calc": calc_materials,
-                "estimate": estimate_materials,
-                "diff": round(calc_materials - estimate_materials)
-            },
-            "work": {
-                "calc": calc_works,
-                "estimate": estimate_works,
-                "diff": round(calc_works - estimate_works)
-            },
-            "equipment": {
-                "calc": calc_equipment,
-                "estimate": estimate_equipment,
-                "diff": round(calc_equipment - estimate_equipment)
-            },
-            "total": {
-                "calc": calc_total,
-                "estimate": estimate_total,
-                "diff": round(calc_total - estimate_total)
+        costs_comparison = {}
+        for name, _, _ in _COMPARE_COST_KEYS:
+            calc_value = calc_costs[name]
+            estimate_value = estimate_costs[name]
+            costs_comparison[name] = {
+                "calc": calc_value,
+                "estimate": estimate_value,
+                "diff": round(calc_value - estimate_value)
             }
-        }
         
         app.logger.debug('Comparison results: %s', {
             "dimensions": dimensions_comparison,
@@ -1505,6 +1499,21 @@ def compare_estimate():
         app.logger.error('Error in compare_estimate: %s', str(e), exc_info=True)
         return jsonify({"success": False, "error": str(e)})
 
+# Дата генерации КП и момент (локальная полночь), до которого она актуальна
+_TODAY_CACHE = (0.0, "")
+
+def _today_str():
+    """Текущая дата в формате ДД.ММ.ГГГГ; строка пересчитывается раз в сутки"""
+    global _TODAY_CACHE
+    now = time.time()
+    expires, text = _TODAY_CACHE
+    if now >= expires:
+        today = datetime.fromtimestamp(now)
+        midnight = datetime.combine(today.date() + timedelta(days=1), datetime.min.time())
+        text = today.strftime("%d.%m.%Y")
+        _TODAY_CACHE = (midnight.timestamp(), text)
+    return text
+
 @app.route('/generate_kp', methods=['POST'])
 def generate_kp():
     """
@@ -1525,56 +1534,69 @@ def generate_kp():
         }
     }
     
+    Параметр запроса include_text=1 добавляет в ответ итоговую сумму прописью
+    (total_cost_text); по умолчанию она не вычисляется.
+    Параметр запроса summary=1 оставляет в kp_items только итоговые суммы
+    (без списков позиций) - для предварительного просмотра.
+    
     Returns:
         JSON с результатами расчета или сообщением об ошибке
     """
-    try:
-        # Получаем данные из запроса
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Не получены данные"}), 400
-            
-        # Извлекаем параметры
-        length = float(data.get("length", 0))
-        width = float(data.get("width", 0))
-        depth = float(data.get("depth", 0))
-        wall_thickness = float(data.get("wall_thickness", 0))
-        profile_id = data.get("profile_id", "kp1")
-        customer = data.get("customer", {})
-        
-        # Проверяем корректность параметров
-        if not all(isinstance(x, (int, float)) for x in [length, width, depth, wall_thickness]):
-            return jsonify({"error": "Все параметры должны быть числами"}), 400
-            
-        if not all(x > 0 for x in [length, width, depth, wall_thickness]):
-            return jsonify({"error": "Все параметры должны быть положительными числами"}), 400
-            
-        # Проверяем корректность профиля
-        if profile_id not in PROFILES:
-            return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
-            
-        # Проверяем наличие обязательных данных заказчика
-        required_customer_fields = ["name", "address", "phone"]
-        missing_fields = [field for field in required_customer_fields if field not in customer]
-        if missing_fields:
-            return jsonify({"error": f"Отсутствуют обязательные данные заказчика: {', '.join(missing_fields)}"}), 400
-        
-        # Выполняем расчет
-        result = calculate(length, width, depth, wall_thickness, profile_id)
-        
-        if "error" in result:
-            return jsonify({"error": result["error"]}), 400
-            
-        # Добавляем данные заказчика
-        result["customer"] = customer
-        
-        # Добавляем дату генерации КП
-        result["generation_date"] = datetime.now().strftime("%d.%m.%Y")
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    # Получаем данные из запроса
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return _error_response(_ERROR_NO_DATA)
+        
+    # Извлекаем параметры
+    length = float(data.get("length", 0))
+    width = float(data.get("width", 0))
+    depth = float(data.get("depth", 0))
+    wall_thickness = float(data.get("wall_thickness", 0))
+    profile_id = data.get("profile_id", "kp1")
+    customer = data.get("customer", {})
+    
+    # Проверяем корректность параметров (типы уже приведены через float)
+    if not _all_positive(length, width, depth, wall_thickness):
+        return _error_response(_ERROR_NOT_POSITIVE)
+        
+    # Проверяем корректность профиля (идентификатор из JSON может быть не строкой)
+    profile = PROFILES.get(profile_id) if isinstance(profile_id, str) else None
+    if profile is None:
+        return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
+        
+    # Проверяем наличие обязательных данных заказчика
+    required_customer_fields = ["name", "address", "phone"]
+    missing_fields = [field for field in required_customer_fields if field not in customer]
+    if missing_fields:
+        return jsonify({"error": f"Отсутствуют обязательные данные заказчика: {', '.join(missing_fields)}"}), 400
+    
+    # Выполняем расчет (общий кэш с /calculate)
+    base_result, _ = _calculate_cached(length, width, depth, wall_thickness, profile_id)
+    
+    if "error" in base_result:
+        return jsonify({"error": base_result["error"]}), 400
+    
+    # Кэшированный словарь общий для всех запросов - дополняем его копию
+    result = {**base_result}
+        
+    # Добавляем данные заказчика
+    result["customer"] = customer
+    
+    # Добавляем дату генерации КП
+    result["generation_date"] = _today_str()
+    
+    # Для предварительного просмотра списки позиций не нужны
+    if request.args.get("summary") == "1":
+        result["kp_items"] = {
+            key: value for key, value in base_result["kp_items"].items()
+            if not key.endswith("_items")
+        }
+    
+    # Сумма прописью нужна только для печатной формы КП
+    if request.args.get("include_text") == "1":
+        result["total_cost_text"] = num2text(result["costs"]["total"])
+    
+    return jsonify(result)
 
 @app.route('/get_profiles', methods=['GET'])
 def get_profiles():
@@ -1584,13 +1606,10 @@ def get_profiles():
     Returns:
         JSON со списком профилей КП
     """
-    try:
-        profiles = get_profiles_list()
-        return jsonify({
-            "profiles": profiles
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    profiles = get_profiles_list()
+    return jsonify({
+        "profiles": profiles
+    })
 
 @app.route('/get_profile/<profile_id>', methods=['GET'])
 def get_profile_route(profile_id):
@@ -1603,19 +1622,14 @@ def get_profile_route(profile_id):
     Returns:
         JSON с параметрами профиля КП или сообщением об ошибке
     """
-    try:
-        # Проверяем корректность профиля
-        if profile_id not in PROFILES:
-            return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
-            
-        # Получаем параметры профиля
-        profile = get_profile(profile_id)
-        
-        return jsonify({
-            "profile": profile
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    # Проверяем корректность профиля
+    profile = PROFILES.get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
+    
+    return jsonify({
+        "profile": profile
+    })
 
 @app.route('/get_dimensions_correction', methods=['POST'])
 def get_dimensions_correction():
@@ -1633,43 +1647,37 @@ def get_dimensions_correction():
     Returns:
         JSON с коэффициентами корректировки или сообщением об ошибке
     """
-    try:
-        # Получаем данные из запроса
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Не получены данные"}), 400
-            
-        # Извлекаем параметры
-        length = float(data.get("length", 0))
-        width = float(data.get("width", 0))
-        depth = float(data.get("depth", 0))
-        profile_id = data.get("profile_id", "kp1")
-        
-        # Проверяем корректность параметров
-        if not all(isinstance(x, (int, float)) for x in [length, width, depth]):
-            return jsonify({"error": "Все параметры должны быть числами"}), 400
-            
-        if not all(x > 0 for x in [length, width, depth]):
-            return jsonify({"error": "Все параметры должны быть положительными числами"}), 400
-            
-        # Проверяем корректность профиля
-        if profile_id not in PROFILES:
-            return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
-            
-        # Получаем коэффициенты корректировки
-        correction_factors = get_dimensions_correction_factor(profile_id, {
-            "length": length,
-            "width": width,
-            "depth": depth
-        })
-        
-        return jsonify({
-            "correction_factors": correction_factors,
-            "profile": PROFILES[profile_id]["name"]
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    # Получаем данные из запроса
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return _error_response(_ERROR_NO_DATA)
+        
+    # Извлекаем параметры
+    length = float(data.get("length", 0))
+    width = float(data.get("width", 0))
+    depth = float(data.get("depth", 0))
+    profile_id = data.get("profile_id", "kp1")
+    
+    # Проверяем корректность параметров (типы уже приведены через float)
+    if not _all_positive(length, width, depth):
+        return _error_response(_ERROR_NOT_POSITIVE)
+        
+    # Проверяем корректность профиля (идентификатор из JSON может быть не строкой)
+    profile = PROFILES.get(profile_id) if isinstance(profile_id, str) else None
+    if profile is None:
+        return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
+        
+    # Получаем коэффициенты корректировки
+    correction_factors = get_dimensions_correction_factor(profile_id, {
+        "length": length,
+        "width": width,
+        "depth": depth
+    })
+    
+    return jsonify({
+        "correction_factors": correction_factors,
+        "profile": profile["name"]
+    })
 
 @app.route('/get_prices', methods=['POST'])
 def get_prices():
@@ -1684,30 +1692,24 @@ def get_prices():
     Returns:
         JSON с ценами материалов и работ или сообщением об ошибке
     """
-    try:
-        # Получаем данные из запроса
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Не получены данные"}), 400
-            
-        # Извлекаем параметры
-        profile_id = data.get("profile_id", "kp1")
-        
-        # Проверяем корректность профиля
-        if profile_id not in PROFILES:
-            return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
-            
-        # Получаем профиль
-        profile = get_profile(profile_id)
-        
-        return jsonify({
-            "materials_prices": profile["materials_prices"],
-            "works_prices": profile["works_prices"],
-            "profile": profile["name"]
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    # Получаем данные из запроса
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return _error_response(_ERROR_NO_DATA)
+        
+    # Извлекаем параметры
+    profile_id = data.get("profile_id", "kp1")
+    
+    # Проверяем корректность профиля (идентификатор из JSON может быть не строкой)
+    profile = PROFILES.get(profile_id) if isinstance(profile_id, str) else None
+    if profile is None:
+        return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
+    
+    return jsonify({
+        "materials_prices": profile["materials_prices"],
+        "works_prices": profile["works_prices"],
+        "profile": profile["name"]
+    })
 
 @app.route('/get_costs', methods=['POST'])
 def get_costs():
@@ -1722,29 +1724,23 @@ def get_costs():
     Returns:
         JSON со стоимостями материалов, работ и оборудования или сообщением об ошибке
     """
-    try:
-        # Получаем данные из запроса
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Не получены данные"}), 400
-            
-        # Извлекаем параметры
-        profile_id = data.get("profile_id", "kp1")
-        
-        # Проверяем корректность профиля
-        if profile_id not in PROFILES:
-            return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
-            
-        # Получаем профиль
-        profile = get_profile(profile_id)
-        
-        return jsonify({
-            "costs": profile["costs"],
-            "profile": profile["name"]
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    # Получаем данные из запроса
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return _error_response(_ERROR_NO_DATA)
+        
+    # Извлекаем параметры
+    profile_id = data.get("profile_id", "kp1")
+    
+    # Проверяем корректность профиля (идентификатор из JSON может быть не строкой)
+    profile = PROFILES.get(profile_id) if isinstance(profile_id, str) else None
+    if profile is None:
+        return jsonify({"error": f"Неизвестный профиль КП: {profile_id}"}), 400
+    
+    return jsonify({
+        "costs": profile["costs"],
+        "profile": profile["name"]
+    })
 
 def calculate(length, width, depth, wall_thickness, profile_id="kp1"):
     """
@@ -1776,7 +1772,7 @@ def calculate(length, width, depth, wall_thickness, profile_id="kp1"):
             app.logger.debug("Using default profile_id 'kp1' instead of %s", profile_id)
             profile_id = "kp1"
         
-        # Получаем параметры профиля
+        # Получаем параметры профиля один раз и передаем его во все расчеты стоимости
         try:
             profile = get_profile(profile_id)
             app.logger.debug("Using profile: %s", profile["name"])
@@ -1799,76 +1795,53 @@ def calculate(length, width, depth, wall_thickness, profile_id="kp1"):
             app.logger.error("Error calculating correction factors: %s", str(e))
             correction_factors = None  # Используем значение по умолчанию
         
+        # Геометрия бассейна считается один раз и используется всеми расчетами ниже
+        geometry = PoolGeometry.from_mm(length, width, depth, wall_thickness)
+        
         # Рассчитываем базовые размеры
         try:
-            basic_dims = calculate_basic_dimensions(length, width, depth, wall_thickness, correction_factors)
+            basic_dims = calculate_basic_dimensions(length, width, depth, wall_thickness, correction_factors, geometry=geometry)
         except Exception as e:
             app.logger.error("Error calculating basic dimensions: %s", str(e))
             return {"error": f"Ошибка при расчете базовых размеров: {str(e)}"}
         
-        # Получаем сырые числовые значения для дальнейших расчетов
-        raw_dims = {}
-        
-        for key, value in basic_dims.items():
-            if key == "_raw":
-                continue
-                
-            if isinstance(value, str):
-                # Пытаемся извлечь числовое значение из строки вида "32.0 м²"
-                parts = value.split()
-                if parts and parts[0]:
-                    try:
-                        raw_value = float(parts[0].replace(',', '.'))
-                        raw_dims[key] = raw_value
-                    except (ValueError, TypeError):
-                        app.logger.warning("Could not extract number from %s", value)
-            elif isinstance(value, (int, float)):
-                raw_dims[key] = value
-        
-        # Сохраняем сырые значения в основной словарь
-        basic_dims["_raw"] = raw_dims
-        
         # Рассчитываем земляные работы
         try:
-            earthworks = calculate_earthworks(length, width, depth, wall_thickness)
+            earthworks = calculate_earthworks(length, width, depth, wall_thickness, geometry=geometry)
         except Exception as e:
             app.logger.error("Error calculating earthworks: %s", str(e))
             return {"error": f"Ошибка при расчете земляных работ: {str(e)}"}
         
         # Рассчитываем бетонные работы
         try:
-            concrete_works = calculate_concrete_works(length, width, depth, wall_thickness)
+            concrete_works = calculate_concrete_works(length, width, depth, wall_thickness, geometry=geometry)
         except Exception as e:
             app.logger.error("Error calculating concrete works: %s", str(e))
             return {"error": f"Ошибка при расчете бетонных работ: {str(e)}"}
         
         # Рассчитываем опалубку
         try:
-            formwork = calculate_formwork(length, width, depth, wall_thickness)
+            formwork = calculate_formwork(length, width, depth, wall_thickness, geometry=geometry)
         except Exception as e:
             app.logger.error("Error calculating formwork: %s", str(e))
             return {"error": f"Ошибка при расчете опалубки: {str(e)}"}
         
         # Рассчитываем отделочные работы
         try:
-            finishing_cost = calculate_finishing_cost(basic_dims, profile_id)
+            finishing_cost = calculate_finishing_cost(basic_dims, profile_id, profile)
         except Exception as e:
             app.logger.error("Error calculating finishing cost: %s", str(e))
             finishing_cost = {}  # Пустой словарь в случае ошибки
         
         # Рассчитываем стоимость материалов
         try:
-            materials_cost = calculate_materials_cost(basic_dims, profile_id)
+            materials_cost = calculate_materials_cost(basic_dims, profile_id, profile)
         except Exception as e:
             app.logger.error("Error calculating materials cost: %s", str(e))
             materials_cost = {}  # Пустой словарь в случае ошибки
         
-        # Рассчитываем стоимость работ
-        try:
-            works_cost = calculate_works_cost(basic_dims, profile_id)
-        except Exception as e:
-            app.logger.error("Error calculating works cost: %s", str(e))
-            works_cost = {}  # Пустой словарь в случае ошибки
+        # Рассчитываем стоимость работ (ошибки логируются во внешнем обработчике)
+        works_cost = calculate_works_cost(basic_dims, profile_id, profile)
         
         # Рассчитываем элементы КП
         try:
@@ -1879,7 +1852,7 @@ def calculate(length, width, depth, wall_thickness, profile_id="kp1"):
             elif profile_id == "kp3":
                 pool_type = "mosaic"
                 
-            kp_items = calculate_kp_items(length, width, depth, pool_type, profile_id)
+            kp_items = calculate_kp_items(length, width, depth, pool_type, profile_id, profile)
         except Exception as e:
             app.logger.error("Error calculating KP items: %s", str(e))
             # В случае ошибки создаем структуру с нулевыми значениями
@@ -1967,6 +1940,83 @@ def calculate(length, width, depth, wall_thickness, profile_id="kp1"):
         app.logger.error("Unexpected error in calculate: %s", str(e), exc_info=True)
         return {"error": f"Неожиданная ошибка при расчете: {str(e)}"}
 
+@lru_cache(maxsize=512)
+def _calculate_cached(length, width, depth, wall_thickness, profile_id):
+    """
+    Кэшированный вариант calculate для маршрутов /calculate, /compare_estimate и /generate_kp
+    
+    Расчет детерминирован, поэтому повторный запрос с теми же размерами и профилем
+    возвращает готовый словарь. Результат общий для всех запросов и не должен изменяться.
+    
+    Returns:
+        tuple: (результат calculate, сериализованный JSON-ответ в bytes)
+    """
+    result = calculate(length, width, depth, wall_thickness, profile_id)
+    return result, _json_bytes(result)
+
+def _cache_profile_id(profile_id):
+    """Привести идентификатор профиля к строке, пригодной для ключа кэша расчетов"""
+    if isinstance(profile_id, dict):
+        profile_id = profile_id.get("id", "kp1")
+    if not isinstance(profile_id, str):
+        profile_id = "kp1"
+    return profile_id
+
+def warm_up():
+    """
+    Прогрев кэша расчетов для размеров из всех профилей КП
+    
+    При запуске gunicorn с --preload выполняется один раз в мастер-процессе,
+    и заполненный кэш достается всем воркерам после fork.
+    """
+    for item in get_profiles_list():
+        dimensions = get_profile(item["id"])["dimensions"]
+        _calculate_cached(
+            float(dimensions["length"]),
+            float(dimensions["width"]),
+            float(dimensions["depth"]),
+            float(dimensions["wall_thickness"]),
+            item["id"]
+        )
+
+if os.environ.get("APP_WARMUP") == "1":
+    warm_up()
+
+if os.environ.get("APP_PROFILING") == "1":
+    import cProfile
+    import pstats
+    from io import StringIO
+    
+    @app.route('/_profile', methods=['GET'])
+    def profile_pipeline():
+        """
+        Профилирование полного расчета (маршрут есть только при APP_PROFILING=1)
+        
+        Выполняет calculate и сериализацию ответа n раз (параметр запроса, по умолчанию 1000)
+        без кэша под cProfile и возвращает 20 самых затратных функций по накопленному времени.
+        """
+        iterations = min(max(request.args.get("n", 1000, type=int), 1), 100000)
+        dimensions = get_profile("kp1")["dimensions"]
+        args = (
+            float(dimensions["length"]),
+            float(dimensions["width"]),
+            float(dimensions["depth"]),
+            float(dimensions["wall_thickness"]),
+            "kp1"
+        )
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for _ in range(iterations):
+            _json_bytes(calculate(*args))
+        profiler.disable()
+        
+        stream = StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(20)
+        return app.response_class(stream.getvalue(), mimetype="text/plain")
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 3000))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # Режим отладки (перезагрузчик и отладчик werkzeug) включается только явно
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    app.run(host='0.0.0.0', port=port, debug=debug, threaded=True) 
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+Настройки gunicorn (файл подхватывается автоматически из рабочего каталога)
+"""
+import os
+
+# Расчеты чисто вычислительные и не ждут I/O, поэтому используем процессы-воркеры
+# без потоков - запросы не конкурируют за GIL. Число воркеров задается через
+# WEB_CONCURRENCY; cpu_count() в контейнере видит ядра хоста, а не квоту,
+# поэтому по умолчанию берется небольшое значение
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "sync"
+threads = 1
+
+# Приложение (и прогрев кэша при APP_WARMUP=1) загружается один раз до fork
+preload_app = True
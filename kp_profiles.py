@@ -3,6 +3,12 @@
 Содержит параметры расчета для разных коммерческих предложений.
 """
 
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
 # Структура КП
 KP1 = {
     "name": "КП №1 (8000x4000x1500)",
@@ -163,12 +169,23 @@ KP3 = {
     }
 }
 
-# Словарь профилей КП
-PROFILES = {
+def _freeze(value):
+    """Рекурсивно обернуть словари в MappingProxyType (профили общие для всех запросов)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+# Профили и все вложенные словари доступны только для чтения
+KP1 = _freeze(KP1)
+KP2 = _freeze(KP2)
+KP3 = _freeze(KP3)
+
+# Словарь профилей КП (только для чтения)
+PROFILES = MappingProxyType({
     "kp1": KP1,
     "kp2": KP2,
     "kp3": KP3
-}
+})
 
 def get_profile(profile_id="kp1"):
     """Получить параметры профиля КП по идентификатору
@@ -179,28 +196,77 @@ def get_profile(profile_id="kp1"):
     Returns:
         dict: Словарь с параметрами профиля. Если профиль не найден, возвращает профиль KP1
     """
-    try:
-        # Если profile_id — словарь, пытаемся извлечь id
-        if isinstance(profile_id, dict):
-            profile_id = profile_id.get("id", "kp1")
-        
-        # Проверяем, что profile_id — строка
-        if not isinstance(profile_id, str):
-            profile_id = "kp1"  # Значение по умолчанию
+    # Если profile_id — словарь, извлекаем id
+    if isinstance(profile_id, dict):
+        profile_id = profile_id.get("id", "kp1")
+    
+    # Проверяем, что profile_id — строка
+    if not isinstance(profile_id, str):
+        profile_id = "kp1"  # Значение по умолчанию
+    
+    # Ищем профиль в словаре PROFILES
+    profile = PROFILES.get(profile_id)
+    if profile is None:
+        logger.warning("Profile %s not found, using KP1 instead", profile_id)
+        return KP1
         
-        # Проверяем, есть ли такой профиль в словаре PROFILES
-        if profile_id not in PROFILES:
-            print(f"Warning: Profile {profile_id} not found, using KP1 instead")
-            return KP1
-            
-        return PROFILES.get(profile_id, KP1)
-    except Exception as e:
-        print(f"Error in get_profile: {str(e)}")
-        return KP1  # Возвращаем KP1 в случае любой ошибки
+    return profile
+
+# Краткие описания профилей (id и название) - PROFILES неизменен, собираются один раз;
+# записи доступны только для чтения, т.к. кортеж общий для всех вызовов
+_PROFILES_LIST = tuple(
+    MappingProxyType({"id": key, "name": profile["name"]}) for key, profile in PROFILES.items()
+)
 
 def get_profiles_list():
-    """Получить список всех доступных профилей КП"""
-    return [{"id": key, "name": profile["name"]} for key, profile in PROFILES.items()]
+    """Получить список всех доступных профилей КП (общий неизменяемый кортеж)"""
+    return _PROFILES_LIST
+
+# Целевые размеры профилей (площадь зеркала, периметр, площадь стен,
+# площадь отделки, объем воды) - постоянны, поэтому собираются один раз
+_CORRECTION_KEYS = ("water_surface", "perimeter", "wall_area", "finishing_area", "water_volume")
+_PROFILE_TARGETS = {
+    key: tuple(profile["basic_dimensions"][name] for name in _CORRECTION_KEYS)
+    for key, profile in PROFILES.items()
+}
+
+def _compute_correction_factors(targets, length, width, depth):
+    """Коэффициенты корректировки для целевых размеров профиля и размеров бассейна в мм"""
+    # Рассчитываем теоретические размеры без корректировки
+    length = length / 1000
+    width = width / 1000
+    depth = depth / 1000
+    
+    theoretical_water_surface = length * width
+    theoretical_perimeter = 2 * (length + width)
+    theoretical_wall_area = theoretical_perimeter * depth
+    theoretical = (
+        theoretical_water_surface,
+        theoretical_perimeter,
+        theoretical_wall_area,
+        theoretical_water_surface + theoretical_wall_area,
+        theoretical_water_surface * depth,
+    )
+    
+    # Коэффициенты корректировки - отношение ожидаемых значений к теоретическим
+    return {
+        name: target / value if value else 1
+        for name, target, value in zip(_CORRECTION_KEYS, targets, theoretical)
+    }
+
+@lru_cache(maxsize=128)
+def _cached_correction_factors(profile_id, length, width, depth):
+    """Коэффициенты для известного профиля; профили неизменны, поэтому результат кэшируется"""
+    return _compute_correction_factors(_PROFILE_TARGETS[profile_id], length, width, depth)
+
+def _warm_correction_cache():
+    """Рассчитать коэффициенты для штатных размеров каждого профиля"""
+    for profile_id, profile in PROFILES.items():
+        dimensions = profile["dimensions"]
+        _cached_correction_factors(profile_id, dimensions["length"], dimensions["width"], dimensions["depth"])
+
+# Коэффициенты для штатных размеров считаются сразу при импорте
+_warm_correction_cache()
 
 def get_dimensions_correction_factor(profile_id, original_dimensions):
     """
@@ -209,24 +275,14 @@ def get_dimensions_correction_factor(profile_id, original_dimensions):
     Возвращает коэффициенты для корректировки расчетов, чтобы итоговые значения
     совпадали с указанными в КП
     """
-    profile = get_profile(profile_id)
+    length = original_dimensions["length"]
+    width = original_dimensions["width"]
+    depth = original_dimensions["depth"]
     
-    # Рассчитываем теоретические размеры без корректировки
-    length = original_dimensions["length"] / 1000
-    width = original_dimensions["width"] / 1000
-    depth = original_dimensions["depth"] / 1000
+    # Для известных профилей результат берется из кэша (копия - вызывающий код может его менять)
+    if isinstance(profile_id, str) and profile_id in _PROFILE_TARGETS:
+        return dict(_cached_correction_factors(profile_id, length, width, depth))
     
-    theoretical_water_surface = length * width
-    theoretical_perimeter = 2 * (length + width)
-    theoretical_wall_area = theoretical_perimeter * depth
-    theoretical_finishing_area = theoretical_water_surface + theoretical_wall_area
-    theoretical_water_volume = theoretical_water_surface * depth
-    
-    # Коэффициенты корректировки - отношение ожидаемых значений к теоретическим
-    return {
-        "water_surface": profile["basic_dimensions"]["water_surface"] / theoretical_water_surface if theoretical_water_surface else 1,
-        "perimeter": profile["basic_dimensions"]["perimeter"] / theoretical_perimeter if theoretical_perimeter else 1,
-        "wall_area": profile["basic_dimensions"]["wall_area"] / theoretical_wall_area if theoretical_wall_area else 1,
-        "finishing_area": profile["basic_dimensions"]["finishing_area"] / theoretical_finishing_area if theoretical_finishing_area else 1,
-        "water_volume": profile["basic_dimensions"]["water_volume"] / theoretical_water_volume if theoretical_water_volume else 1,
-    } 
\ No newline at end of file
+    basic_dimensions = get_profile(profile_id)["basic_dimensions"]
+    targets = tuple(basic_dimensions[name] for name in _CORRECTION_KEYS)
+    return _compute_correction_factors(targets, length, width, depth)
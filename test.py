@@ -1,19 +1,28 @@
-from app import PoolCalculator
+def main():
+    from app import calculate, calculate_concrete_works, calculate_formwork
+    
+    # Тестовые размеры из КП №1 (длина, ширина, глубина, толщина стенки в мм)
+    dimensions = (8000, 4000, 1650, 200)
 
-# Тестовые размеры из КП
-calculator = PoolCalculator(8000, 4000, 1650)
+    # Получаем все расчеты
+    concrete = calculate_concrete_works(*dimensions)
+    formwork = calculate_formwork(*dimensions)
+    total_cost = calculate(*dimensions, profile_id="kp1")["costs"]["total"]
 
-# Получаем все расчеты
-concrete = calculator.calculate_concrete_works()
-formwork = calculator.calculate_formwork()
-total_cost = calculator.calculate_total_cost()
+    # Весь отчет выводится одним вызовом print
+    lines = (
+        "\nПроверка соответствия КП:",
+        "-" * 50,
+        f"Бетон основания: {concrete['Объем бетона основания']}",
+        f"Бетон стен: {concrete['Объем бетона стен']}",
+        f"Общий объем бетона: {concrete['Общий объем бетона']}",
+        f"Арматура: {concrete['Вес арматуры']}",
+        f"Количество фанеры: {formwork['Количество листов фанеры']}",
+        f"Общая стоимость: {total_cost:,} ₽",
+        "-" * 50,
+    )
+    print(*lines, sep="\n")
 
-print("\nПроверка соответствия КП:")
-print("-" * 50)
-print(f"Бетон М300: {concrete['Бетон М300 (чаша)']}")
-print(f"Бетон М200: {concrete['Бетон М200 (подбетонка)']}")
-print(f"Общий объем бетона: {concrete['Общий объем бетона']}")
-print(f"Арматура: {formwork['Арматура']}")
-print(f"Количество фанеры: {formwork['Количество фанеры']}")
-print(f"Общая стоимость: {total_cost:,} ₽")
-print("-" * 50)
+
+if __name__ == "__main__":
+    main()
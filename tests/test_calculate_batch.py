@@ -0,0 +1,52 @@
+"""
+Тесты пакетного расчета /calculate_batch
+"""
+
+import unittest
+
+from app import app, _BATCH_MAX_SIZE
+
+_PARAMS = ("length", "width", "depth", "wall_thickness")
+
+
+def _columns(*values):
+    """Одинаковые списки значений для всех четырех параметров"""
+    return {param: list(values) for param in _PARAMS}
+
+
+class CalculateBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def assertJsonError(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content_type, "application/json")
+        self.assertIn("error", response.get_json())
+
+    def test_valid_batch(self):
+        response = self.client.post("/calculate_batch", json=_columns(8000, 6000))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()["concrete_volume"]), 2)
+
+    def test_body_must_be_object(self):
+        self.assertJsonError(self.client.post("/calculate_batch", json=[1]))
+        self.assertJsonError(self.client.post("/calculate_batch", json="x"))
+
+    def test_rejects_non_finite_values(self):
+        self.assertJsonError(self.client.post("/calculate_batch", json=_columns("inf")))
+        self.assertJsonError(self.client.post("/calculate_batch", json=_columns("nan")))
+
+    def test_rejects_overflowing_values(self):
+        self.assertJsonError(self.client.post("/calculate_batch", json=_columns(1e308)))
+
+    def test_rejects_non_positive_values(self):
+        self.assertJsonError(self.client.post("/calculate_batch", json=_columns(0)))
+        self.assertJsonError(self.client.post("/calculate_batch", json=_columns(-1)))
+
+    def test_rejects_oversized_batch(self):
+        self.assertJsonError(self.client.post("/calculate_batch", json=_columns(*[1000] * (_BATCH_MAX_SIZE + 1))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Тесты суммы прописью (num2text) и поля total_cost_text в /generate_kp
+"""
+
+import unittest
+
+from app import app, num2text
+
+
+class Num2TextTest(unittest.TestCase):
+
+    def test_ruble_endings(self):
+        self.assertEqual(num2text(1), "Один рубль 00 копеек")
+        self.assertEqual(num2text(2), "Два рубля 00 копеек")
+        self.assertEqual(num2text(5), "Пять рублей 00 копеек")
+        self.assertEqual(num2text(11), "Одиннадцать рублей 00 копеек")
+        self.assertEqual(num2text(21), "Двадцать один рубль 00 копеек")
+
+    def test_thousands_are_feminine(self):
+        self.assertEqual(num2text(1000), "Одна тысяча рублей 00 копеек")
+        self.assertEqual(num2text(2000), "Две тысячи рублей 00 копеек")
+        self.assertEqual(num2text(5000), "Пять тысяч рублей 00 копеек")
+
+    def test_millions(self):
+        self.assertEqual(num2text(1000000), "Один миллион рублей 00 копеек")
+        self.assertEqual(num2text(2000000), "Два миллиона рублей 00 копеек")
+        self.assertEqual(num2text(5000000), "Пять миллионов рублей 00 копеек")
+
+    def test_kp_total_with_kopecks(self):
+        self.assertEqual(
+            num2text(2947568.5),
+            "Два миллиона девятьсот сорок семь тысяч пятьсот шестьдесят восемь рублей 50 копеек",
+        )
+
+    def test_kopecks_always_two_digits(self):
+        self.assertEqual(num2text(0), "Ноль рублей 00 копеек")
+        self.assertEqual(num2text(0.01), "Ноль рублей 01 копейка")
+        self.assertEqual(num2text(1.22), "Один рубль 22 копейки")
+
+
+class GenerateKpTextTest(unittest.TestCase):
+
+    def test_total_cost_text_matches_total(self):
+        client = app.test_client()
+        response = client.post("/generate_kp?include_text=1", json={
+            "length": 8000,
+            "width": 4000,
+            "depth": 1650,
+            "wall_thickness": 200,
+            "profile_id": "kp1",
+            "customer": {"name": "Тест", "address": "Тест", "phone": "0"},
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["total_cost_text"], num2text(data["costs"]["total"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
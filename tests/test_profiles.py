@@ -0,0 +1,34 @@
+"""
+Тесты неизменяемости профилей КП
+"""
+
+import unittest
+
+from kp_profiles import PROFILES, get_profile, get_profiles_list
+
+
+class ProfilesImmutabilityTest(unittest.TestCase):
+
+    def test_profiles_mapping_is_read_only(self):
+        with self.assertRaises(TypeError):
+            PROFILES["kp4"] = {}
+
+    def test_profile_is_read_only(self):
+        with self.assertRaises(TypeError):
+            PROFILES["kp1"]["name"] = "changed"
+        with self.assertRaises(TypeError):
+            get_profile("kp2")["lining_price"] = 1
+
+    def test_nested_dicts_are_read_only(self):
+        with self.assertRaises(TypeError):
+            PROFILES["kp1"]["materials_prices"]["concrete"] = 1
+        with self.assertRaises(TypeError):
+            PROFILES["kp3"]["costs"]["total"] = 1
+
+    def test_profiles_list_entries_are_read_only(self):
+        with self.assertRaises(TypeError):
+            get_profiles_list()[0]["name"] = "changed"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Тесты ответов об ошибках маршрутов JSON-API
+"""
+
+import unittest
+
+from app import app
+
+_POST_ROUTES = ("/generate_kp", "/get_dimensions_correction", "/get_prices", "/get_costs")
+
+
+class RouteErrorsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def assertJsonError(self, response, status=400):
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response.content_type, "application/json")
+        self.assertIn("error", response.get_json())
+
+    def test_non_object_body_is_client_error(self):
+        for route in _POST_ROUTES:
+            for body in ([1, 2], "x", 5):
+                with self.subTest(route=route, body=body):
+                    self.assertJsonError(self.client.post(route, json=body))
+
+    def test_non_string_profile_id_is_client_error(self):
+        for route in ("/get_prices", "/get_costs"):
+            with self.subTest(route=route):
+                response = self.client.post(route, json={"profile_id": [1]})
+                self.assertJsonError(response)
+                self.assertNotIn("unhashable", response.get_json()["error"])
+
+    def test_bad_number_does_not_leak_exception_text(self):
+        response = self.client.post("/get_dimensions_correction", json={
+            "length": "abc", "width": 1, "depth": 1,
+        })
+        self.assertJsonError(response)
+        self.assertNotIn("could not convert", response.get_json()["error"])
+
+    def test_unknown_route_keeps_standard_404(self):
+        self.assertEqual(self.client.get("/no-such-route").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()